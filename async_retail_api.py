@@ -0,0 +1,232 @@
+import asyncio
+from typing import Dict, List, Optional
+
+from retail_api import TokenCache, merge_batch_results
+from utils.outbox import DRAIN_PAGE_FACTOR
+from utils.payload import REJECTED_STATUSES, PayloadEncoder
+from utils.retry import build_retry
+
+try:
+    import httpx
+except ImportError:  # 可选依赖，未安装时仍可使用同步的 RetailAPI
+    httpx = None
+
+class AsyncRetailAPI:
+    """基于 httpx.AsyncClient 的异步接口封装
+
+    与 RetailAPI 接口一致（login / upload_retail_data / upload_retail_data_batched），
+    同一事件循环内可同时发送多个请求并复用连接，不需要为每个请求创建线程。
+    与 RetailAPI 共用 TokenCache，token 在同步和异步客户端之间共享。
+    """
+    def __init__(self, base_url: str, max_connections: int = 4,
+                 token_cache: Optional[TokenCache] = None, retry_config: Optional[Dict] = None,
+                 upload_config: Optional[Dict] = None):
+        if httpx is None:
+            raise ImportError("异步上报需要安装 httpx: pip install httpx")
+        self.base_url = base_url
+        self.token = None
+        self.token_cache = token_cache or TokenCache()
+        self.max_connections = max(1, max_connections)
+        self.timeout = 30
+        self._credentials = None
+        self._login_lock = None  # 在事件循环内首次使用时创建
+        self.client = httpx.AsyncClient(
+            trust_env=False,  # 禁用环境变量中的代理设置
+            verify=False,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections)
+        )
+        # 与 RetailAPI 相同的重试和熔断策略
+        self.retry_policies, self.breaker = build_retry(retry_config, url=base_url)
+        self.retry_exceptions = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+        self.encoder = PayloadEncoder.from_config(base_url, upload_config)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """关闭连接池"""
+        await self.client.aclose()
+
+    async def _post(self, endpoint: str, url: str, **kwargs):
+        """发送POST请求，按接口对应的重试策略重试"""
+        return await self.retry_policies[endpoint].call_async(
+            lambda: self.client.post(url, **kwargs),
+            self.retry_exceptions,
+            self.breaker,
+            name='登录' if endpoint == 'login' else '上报'
+        )
+
+    async def login(self, username: str, password: str, force: bool = False) -> bool:
+        """登录并获取token，缓存中有可用token时直接复用"""
+        self._credentials = (username, password)
+        if not force:
+            cached_token = self.token_cache.get(self.base_url, username)
+            if cached_token:
+                self.token = cached_token
+                print("使用缓存的token，跳过登录")
+                return True
+
+        url = f"{self.base_url}/token/grant"
+        print(f"正在尝试登录: {url}")
+        print(f"用户名: {username}")
+        try:
+            response = await self._post(
+                'login',
+                url,
+                data={"username": username, "password": password},
+                headers={'Content-Type': 'application/x-www-form-urlencoded'}
+            )
+            print(f"响应状态码: {response.status_code}")
+            if response.status_code != 200:
+                print(f"HTTP错误: {response.status_code}")
+                return False
+
+            result = response.json()
+            if result.get("code") != 200:
+                print(f"登录失败: {result.get('msg')}")
+                return False
+
+            self.token = f"Bearer {result.get('token')}"
+            self.token_cache.set(self.base_url, username, self.token)
+            return True
+
+        except httpx.TimeoutException:
+            print("连接超时")
+            return False
+        except Exception as e:
+            print(f"请求异常: {str(e)}")
+            return False
+
+    async def _relogin(self, stale_token: str) -> bool:
+        """token 失效时重新登录，多个请求同时遇到401时只登录一次"""
+        if not self._credentials:
+            return False
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        async with self._login_lock:
+            if self.token != stale_token:
+                return True  # 其他请求已刷新token
+            username, password = self._credentials
+            self.token_cache.invalidate(self.base_url, username)
+            print("token已失效，重新登录...")
+            return await self.login(username, password, force=True)
+
+    async def _post_data(self, url: str, data: List[Dict], token: str):
+        """发送上报请求，压缩的请求体被服务端拒绝（400/415）时不压缩重新发送"""
+        body, headers = self.encoder.encode(data)
+        response = await self._post('upload', url, content=body, headers={**headers, 'Authorization': token})
+        if self.encoder.should_fallback(response.status_code, headers):
+            body, headers = self.encoder.encode(data, compress=False)
+            response = await self._post('upload', url, content=body, headers={**headers, 'Authorization': token})
+            if response.status_code not in REJECTED_STATUSES:
+                self.encoder.reject()
+        return response
+
+    async def upload_retail_data(self, data: List[Dict]) -> Optional[Dict]:
+        """上报零售数据，接口返回401时自动重新登录并重试一次"""
+        if not self.token:
+            print("未登录，请先调用login方法")
+            return None
+
+        url = f"{self.base_url}/dc/api/v1/collection/retail"
+        print(f"上报数据条数: {len(data)}")
+        try:
+            for attempt in range(2):
+                token = self.token
+                response = await self._post_data(url, data, token)
+                print(f"响应状态码: {response.status_code}")
+
+                result = response.json() if response.status_code == 200 else None
+                unauthorized = response.status_code == 401 or (result and result.get("code") == 401)
+                if unauthorized and attempt == 0 and await self._relogin(token):
+                    continue
+                break
+
+            if response.status_code == 200:
+                return result
+            print(f"上报失败: HTTP {response.status_code}")
+            print(f"错误信息: {response.text}")
+            return None
+
+        except Exception as e:
+            print(f"上报异常: {str(e)}")
+            return None
+
+    async def upload_many(self, batches: List[List[Dict]],
+                          concurrency: Optional[int] = None) -> List[Optional[Dict]]:
+        """并发上报多批数据，按批次顺序返回结果"""
+        semaphore = asyncio.Semaphore(concurrency or self.max_connections)
+
+        async def upload(batch):
+            async with semaphore:
+                return await self.upload_retail_data(batch)
+
+        return await asyncio.gather(*(upload(batch) for batch in batches))
+
+    async def upload_retail_data_batched(self, data: List[Dict], batch_size: int = 500,
+                                         concurrency: Optional[int] = None) -> Optional[Dict]:
+        """分批并发上报零售数据，结果格式与 RetailAPI.upload_retail_data_batched 相同"""
+        if not self.token:
+            print("未登录，请先调用login方法")
+            return None
+
+        if batch_size <= 0 or len(data) <= batch_size:
+            return await self.upload_retail_data(data)
+
+        batches = [data[i:i + batch_size] for i in range(0, len(data), batch_size)]
+        print(f"分批上报: 共 {len(data)} 条数据，{len(batches)} 批")
+        results = await self.upload_many(batches, concurrency)
+        return merge_batch_results(batches, results)
+
+async def drain_outbox_async(api: AsyncRetailAPI, outbox, limit: Optional[int] = None) -> Dict:
+    """使用异步客户端发送发件箱中所有到期批次，返回格式与 Outbox.drain 相同
+
+    与 Outbox.drain 一样按页读取到期批次，每页为连接数的 DRAIN_PAGE_FACTOR 倍。
+    """
+    summary = {'sent': 0, 'failed': 0, 'sent_rows': 0, 'failed_rows': 0,
+               'content': [], 'errors': []}
+    for entries in outbox.due_pages(api.max_connections * DRAIN_PAGE_FACTOR, limit):
+        results = await api.upload_many([rows for _, _, rows in entries])
+        for (entry_id, _, rows), result in zip(entries, results):
+            if result and result.get("code") == 200:
+                outbox.ack(entry_id)
+                summary['sent'] += 1
+                summary['sent_rows'] += len(rows)
+                summary['content'].extend(result.get("content", []))
+            else:
+                outbox.fail(entry_id, str(result))
+                summary['failed'] += 1
+                summary['failed_rows'] += len(rows)
+                summary['errors'].append(str(result))
+    return summary
+
+def upload_with_async_client(api_config: Dict, data: List[Dict], batch_size: int = 500,
+                             max_connections: int = 4, retry_config: Optional[Dict] = None,
+                             upload_config: Optional[Dict] = None) -> Optional[Dict]:
+    """在新的事件循环中登录并分批上报，供定时任务或界面后台线程调用"""
+    async def run():
+        async with AsyncRetailAPI(api_config['url'], max_connections, retry_config=retry_config,
+                                  upload_config=upload_config) as api:
+            if not await api.login(api_config['username'], api_config['password']):
+                raise RuntimeError("API登录失败")
+            return await api.upload_retail_data_batched(data, batch_size)
+
+    return asyncio.run(run())
+
+def drain_with_async_client(api_config: Dict, outbox, max_connections: int = 4,
+                            retry_config: Optional[Dict] = None,
+                            upload_config: Optional[Dict] = None) -> Dict:
+    """在新的事件循环中登录并发送发件箱中到期的批次"""
+    async def run():
+        async with AsyncRetailAPI(api_config['url'], max_connections, retry_config=retry_config,
+                                  upload_config=upload_config) as api:
+            if not await api.login(api_config['username'], api_config['password']):
+                raise RuntimeError("API登录失败")
+            return await drain_outbox_async(api, outbox)
+
+    return asyncio.run(run())
@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from retail_api import RetailAPI
+from main import DEFAULT_API_CONFIG, DEFAULT_DB_CONFIG, upload_from_db
+from utils.history_store import HistoryStore
+from utils.logger import Logger
+
+logger = Logger('backfill')
+
+def date_partitions(start: str, end: str) -> List[str]:
+    """把日期范围（YYYY-MM-DD，含首尾）拆分为按天的分区"""
+    start_date = datetime.strptime(start, '%Y-%m-%d').date()
+    end_date = datetime.strptime(end, '%Y-%m-%d').date()
+    if end_date < start_date:
+        raise ValueError(f"结束日期 {end} 早于开始日期 {start}")
+    if end_date > date.today():
+        raise ValueError(f"结束日期 {end} 晚于今天")
+    return [(start_date + timedelta(days=i)).isoformat() for i in range((end_date - start_date).days + 1)]
+
+class Backfill:
+    """按日期范围补报数据
+
+    日期范围按天拆分，最多同时补报 max_parallel 天，每天使用独立的发件箱（state_dir/<日期>/）。
+    每天的完成情况记录在 state_dir/state.json 中，中断后重新执行同一范围时跳过已完成的日期；
+    restart=True 时全部重新补报。补报读取当天全部数据，不影响增量上报的水位，
+    重复上报的数据按 itemId 去重。
+    """
+    def __init__(self, config: Dict, start: str, end: str, max_parallel: Optional[int] = None,
+                 state_dir: str = 'backfill', restart: bool = False, source: str = '数据补报'):
+        self.config = config
+        self.dates = date_partitions(start, end)
+        backfill_config = config.get('backfill', {})
+        self.max_parallel = max(1, max_parallel or backfill_config.get('max_parallel', 3))
+        self.state_dir = state_dir
+        self.state_file = os.path.join(state_dir, 'state.json')
+        self.source = source
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self.state = {} if restart else self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"读取补报状态失败，重新补报: {str(e)}")
+            return {}
+
+    def _update(self, day: str, **fields):
+        """更新某一天的状态并写入状态文件"""
+        with self._lock:
+            self.state.setdefault(day, {}).update(fields)
+            os.makedirs(self.state_dir, exist_ok=True)
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=4, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.state_file)
+
+    def pending_dates(self) -> List[str]:
+        """尚未完成的日期"""
+        return [day for day in self.dates if self.state.get(day, {}).get('state') != '完成']
+
+    def cancel(self):
+        """取消补报：正在补报的日期完成后停止，未开始的日期保留到下次继续"""
+        self._cancelled.set()
+
+    def run_partition(self, api: RetailAPI, day: str) -> Dict:
+        """补报一天的数据"""
+        if self._cancelled.is_set():
+            return self.state.get(day, {})
+        self._update(day, state='运行中', started=datetime.now().strftime('%Y-%m-%d %H:%M:%S'), error=None)
+        partition_dir = os.path.join(self.state_dir, day)
+        try:
+            os.makedirs(partition_dir, exist_ok=True)
+            db_config = dict(self.config.get('database') or DEFAULT_DB_CONFIG)
+            # 每个并发补报的日期占用一个数据库连接
+            db_config['pool_size'] = max(db_config.get('pool_size', 3), self.max_parallel)
+            log = lambda message: logger.info(f"[{day}] {message}")
+            summary = upload_from_db(api, self.config, db_config, log=log, source=self.source,
+                                     state_dir=partition_dir, report_date=day)
+
+            # 读取数据库出错时当天数据可能不完整，记为失败，下次补报时重新读取
+            complete = not summary['failed'] and not summary['pending'] and not summary['db_error']
+            if summary['uploaded'] or summary['failed'] or summary['db_error']:
+                HistoryStore().add('成功' if complete else '失败', summary['uploaded'] + summary['failed'],
+                                   f"{day}: 成功 {summary['uploaded']} 条，失败 {summary['failed']} 条",
+                                   "\n".join(summary['errors']) or None, self.source)
+            self._update(day, state='完成' if complete else '失败', uploaded=summary['uploaded'],
+                         failed=summary['failed'], error=summary['db_error'],
+                         finished=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            if complete:
+                shutil.rmtree(partition_dir, ignore_errors=True)
+        except Exception as e:
+            logger.error(f"[{day}] 补报失败: {str(e)}")
+            self._update(day, state='失败', error=str(e), finished=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        return self.state[day]
+
+    def run(self, on_finished: Callable[[str, Dict], None] = None) -> Dict[str, Dict]:
+        """并发补报所有未完成的日期，返回 {日期: 状态}"""
+        dates = self.pending_dates()
+        skipped = len(self.dates) - len(dates)
+        logger.info(f"补报 {self.dates[0]} 至 {self.dates[-1]}: 共 {len(self.dates)} 天，"
+                    f"已完成 {skipped} 天，待补报 {len(dates)} 天，最多同时补报 {self.max_parallel} 天")
+        if not dates:
+            return {day: self.state[day] for day in self.dates}
+
+        api_config = self.config.get('api') or DEFAULT_API_CONFIG
+        upload_config = self.config.get('upload', {})
+        # 各日期共用一个客户端，每天 max_workers 个上报线程，连接池按同时运行的天数放大
+        workers = upload_config.get('max_workers', 4) * min(self.max_parallel, len(dates))
+        api = RetailAPI(api_config['url'], max_workers=workers,
+                        retry_config=self.config.get('retry'), upload_config=upload_config)
+        if not api.login(api_config['username'], api_config['password']):
+            raise RuntimeError("API登录失败")
+
+        def run_one(day):
+            status = self.run_partition(api, day)
+            if on_finished and status:
+                on_finished(day, status)
+            return status
+
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel, len(dates))) as executor:
+            list(executor.map(run_one, dates))
+
+        result = {day: self.state.get(day, {'state': '未开始'}) for day in self.dates}
+        failed = [day for day, status in result.items() if status.get('state') != '完成']
+        logger.info(f"补报结束: 完成 {len(self.dates) - len(failed)} 天，未完成 {len(failed)} 天"
+                    + (f" ({', '.join(failed)})" if failed else ""))
+        return result
@@ -0,0 +1,325 @@
+"""MySQL binlog 实时上报
+
+读取 MySQL binlog 中映射数据表的新增和修改（ROW 格式的行事件），按 table_mapping 的字段映射
+转换为与定时上报相同格式的数据，每隔几秒按批写入发件箱并上报，不再定时查询数据库。
+
+需要安装 mysql-replication，数据库开启 binlog（binlog_format=ROW），
+账号需要 REPLICATION SLAVE、REPLICATION CLIENT 权限。
+
+用法:
+    python binlog_cdc.py
+    python binlog_cdc.py --record events.jsonl               # 同时把读取到的行事件记录到文件
+    python binlog_cdc.py --fixture events.jsonl --dry-run    # 回放记录的事件，只转换和验证，不上报
+
+退出码: 0 正常结束；2 配置错误或缺少依赖；3 登录失败
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from db_utils import load_field_types, load_table_mapping
+from main import DEFAULT_API_CONFIG, DEFAULT_DB_CONFIG, drain_outbox
+from retail_api import RetailAPI
+from utils.logger import Logger
+from utils.outbox import Outbox
+from utils.quarantine import Quarantine
+from utils.validator import DataValidator
+from utils.watermark import WatermarkStore
+
+try:
+    from pymysqlreplication import BinLogStreamReader
+    from pymysqlreplication.event import HeartbeatLogEvent, QueryEvent, XidEvent
+    from pymysqlreplication.row_event import UpdateRowsEvent, WriteRowsEvent
+except ImportError:  # 可选依赖，未安装时仍可回放记录的事件
+    BinLogStreamReader = None
+
+logger = Logger('binlog_cdc')
+
+# 行事件: (表名, [行数据 {列名: 值}], binlog位置 {'log_file', 'log_pos'})
+# 只有事务提交后的事件带位置，从事务中间的位置继续读取会丢失该事务的表结构映射（TableMapEvent）
+Event = Tuple[Optional[str], List[Dict], Optional[Dict]]
+
+class RowMapper:
+    """把 binlog 中的一行（数据库列名）按 table_mapping 转换为上报数据
+
+    转换结果与定时上报的SQL查询一致：itemId 由 report_date 和 id 生成，
+    字段类型按 api_config.json 转换（见 db_utils.SQL_TYPE_CASTS）。
+    """
+    def __init__(self, table_mapping: Dict, field_types: Optional[Dict[str, str]] = None):
+        self.fields = table_mapping.get('fields', {})
+        if not self.fields:
+            raise ValueError("字段映射配置为空")
+        self.field_types = field_types if field_types is not None else load_field_types()
+
+    @staticmethod
+    def _convert(value: Any, field_type: str) -> Any:
+        if value is None:
+            return None
+        if field_type == 'date':
+            return value.strftime('%Y-%m-%d') if isinstance(value, (date, datetime)) else str(value)[:10]
+        if field_type == 'datetime':
+            return value.strftime('%Y-%m-%d %H:%M:%S') if isinstance(value, (date, datetime)) else str(value)[:19]
+        if field_type == 'float':
+            return float(value)
+        if field_type == 'int':
+            # 与 CAST(... AS SIGNED) 一致，小数四舍五入
+            return int(Decimal(str(value)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, (date, datetime)):
+            return value.strftime('%Y-%m-%d')
+        return value
+
+    def __call__(self, row: Dict) -> Dict:
+        if 'id' not in row or 'report_date' not in row:
+            raise ValueError(f"binlog 行数据缺少 id 或 report_date 列（列名: {', '.join(map(str, row))}），"
+                             "请确认数据库开启 binlog_row_metadata=FULL 或账号可读取 information_schema")
+        if row['id'] is None or row['report_date'] is None:
+            raise ValueError("id 或 report_date 为空，无法生成 itemId")
+        report_date = self._convert(row['report_date'], 'date')
+        # 与 CONCAT('YN', DATE_FORMAT(report_date, '%Y%m%d'), LPAD(id, 6, '0')) 一致
+        record = {'itemId': f"YN{report_date.replace('-', '')}{str(row['id']).zfill(6)[:6]}"}
+        for db_field, api_field in self.fields.items():
+            field_type = 'date' if db_field == 'report_date' else self.field_types.get(api_field, 'string')
+            record[api_field] = self._convert(row.get(db_field), field_type)
+        return record
+
+def binlog_events(db_config: Dict, table_name: str, server_id: int = 1001,
+                  position: Optional[Dict] = None, heartbeat: float = 1) -> Iterator[Event]:
+    """从 binlog 读取映射数据表的新增和修改，position 为空时从当前位置开始
+
+    行事件不带位置；事务提交（XidEvent，或非事务表的 COMMIT / DDL 语句）时产出不含行数据、
+    带提交后位置的事件，调用方只保存这些位置，重启后从完整事务的边界继续读取。
+    数据库空闲时服务端每隔 heartbeat 秒发送心跳，产出不含行数据和位置的事件，便于调用方按时间提交批次。
+    """
+    if BinLogStreamReader is None:
+        raise ImportError("读取binlog需要安装 mysql-replication: pip install mysql-replication")
+    position = position or {}
+    stream = BinLogStreamReader(
+        connection_settings={
+            'host': db_config['host'],
+            'port': int(db_config.get('port', 3306)),
+            'user': db_config['user'],
+            'passwd': db_config['password']
+        },
+        server_id=server_id,
+        resume_stream=True,
+        log_file=position.get('log_file'),
+        log_pos=position.get('log_pos'),
+        only_schemas=[db_config['database']],
+        only_tables=[table_name],
+        only_events=[WriteRowsEvent, UpdateRowsEvent, XidEvent, QueryEvent, HeartbeatLogEvent],
+        blocking=True,
+        slave_heartbeat=heartbeat
+    )
+    try:
+        for event in stream:
+            if isinstance(event, HeartbeatLogEvent):
+                yield None, [], None
+            elif isinstance(event, XidEvent) or (
+                    isinstance(event, QueryEvent) and str(event.query).strip().upper() != 'BEGIN'):
+                yield None, [], {'log_file': stream.log_file, 'log_pos': stream.log_pos}
+            elif isinstance(event, (WriteRowsEvent, UpdateRowsEvent)):
+                # 修改事件取修改后的值，删除事件不上报
+                rows = [row['after_values'] if 'after_values' in row else row['values'] for row in event.rows]
+                yield event.table, rows, None
+    finally:
+        stream.close()
+
+def fixture_events(path: str) -> Iterator[Event]:
+    """回放 record_events 记录的事件文件（每行一个JSON事件）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                event = json.loads(line)
+                yield event.get('table'), event.get('rows', []), event.get('position')
+
+def record_events(events: Iterator[Event], path: str) -> Iterator[Event]:
+    """把含行数据或提交位置的事件追加记录到文件，同时原样产出"""
+    with open(path, 'a', encoding='utf-8') as f:
+        for table, rows, position in events:
+            if rows or position:
+                f.write(json.dumps({'table': table, 'rows': rows, 'position': position},
+                                   ensure_ascii=False, default=str) + "\n")
+                f.flush()
+            yield table, rows, position
+
+class BinlogCDC:
+    """binlog 实时上报：按批提交行事件
+
+    行数据转换后先缓存，达到 upload.batch_size 条或距上次提交超过 cdc.flush_interval 秒时提交：
+    验证失败的记录写入隔离区（实时上报不能因个别数据停止），其余写入发件箱后保存最近一次事务提交的
+    binlog 位置，再发送发件箱中到期的批次。程序重启后从保存的位置继续读取，未确认的数据由发件箱重试；
+    在事务中间提交的批次，重启后会从该事务开头重新读取，重复上报的数据按 itemId 去重。
+    与定时上报一致，只上报上报日期为当天的数据，历史日期的修改请使用补报。
+    """
+    def __init__(self, config: Dict, api: Optional[RetailAPI] = None, state_path: str = 'cdc_state.json',
+                 dry_run: bool = False, source: str = '实时上报'):
+        self.api = api
+        self.dry_run = dry_run
+        self.source = source
+        table_mapping = config.get('table_mapping') or load_table_mapping()
+        self.table_name = table_mapping.get('table_name', 'retail_data')
+        self.mapper = RowMapper(table_mapping)
+
+        cdc_config = config.get('cdc', {})
+        upload_config = config.get('upload', {})
+        validation = config.get('validation', {})
+        self.flush_interval = cdc_config.get('flush_interval', 2)
+        self.batch_size = upload_config.get('batch_size', 500)
+        self.max_workers = upload_config.get('max_workers', 4)
+        self.outbox = None if dry_run else Outbox()
+        self.quarantine = Quarantine(
+            max_file_mb=validation.get('max_quarantine_mb', 10),
+            keep_days=validation.get('quarantine_keep_days', 30)
+        )
+        database = (config.get('database') or DEFAULT_DB_CONFIG)['database']
+        self.positions = WatermarkStore(state_path)
+        self.position_key = f"{database}.{self.table_name}"
+        self.position = None
+        self.saved_position = None
+
+        self.buffer: List[Dict] = []
+        self.last_flush = time.monotonic()
+        self.stats = {'rows': 0, 'queued': 0, 'skipped': 0, 'quarantined': 0, 'uploaded': 0, 'failed': 0}
+
+    def start_position(self) -> Optional[Dict]:
+        """上次保存的 binlog 位置"""
+        return self.positions.get(self.position_key)
+
+    def add_rows(self, rows: List[Dict]):
+        """转换一个行事件中的数据并加入缓存，无法转换的行写入隔离区后继续处理"""
+        today = date.today().isoformat()
+        failed_records = []
+        for row in rows:
+            self.stats['rows'] += 1
+            try:
+                record = self.mapper(row)
+            except Exception as e:
+                # 个别数据异常不能停止实时上报，否则重启后会在同一事件上再次失败
+                failed_records.append({'data': row, 'error': f"数据转换失败: {str(e)}"})
+                continue
+            if record.get('reportDate') != today:
+                self.stats['skipped'] += 1
+                continue
+            self.buffer.append(record)
+
+        if failed_records:
+            self.quarantine.add(failed_records, self.source)
+            logger.warning(Quarantine.summarize(failed_records) + "\n以上数据已写入隔离区(quarantine目录)")
+            self.stats['quarantined'] += len(failed_records)
+
+    def flush(self):
+        """提交缓存的数据并保存 binlog 位置"""
+        # 同一批次内多次修改的数据只上报最新的值
+        data = list({record['itemId']: record for record in self.buffer}.values())
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+        failed_records = DataValidator.validate_batch_data(data)
+        if failed_records:
+            self.quarantine.add(failed_records, self.source)
+            logger.warning(Quarantine.summarize(failed_records) + "\n以上数据已写入隔离区(quarantine目录)")
+            failed_ids = {id(record['data']) for record in failed_records}
+            data = [row for row in data if id(row) not in failed_ids]
+            self.stats['quarantined'] += len(failed_records)
+
+        if self.dry_run:
+            if data:
+                logger.info(f"dry-run: {len(data)} 条数据待上报，示例: {data[0]}")
+            self.stats['queued'] += len(data)
+            return
+
+        # 先写入发件箱再保存位置（只保存事务提交处的位置）：程序中断时最多重复读取已写入发件箱的事件，不会丢失数据
+        if data:
+            self.outbox.put_many(data, self.batch_size, self.source)
+            self.stats['queued'] += len(data)
+        if self.position and self.position != self.saved_position:
+            self.positions.set(self.position_key, self.position)
+            self.saved_position = self.position
+
+        if self.api and (data or self.outbox.due(limit=1)):
+            summary = drain_outbox(self.api, self.outbox, self.max_workers)
+            self.stats['uploaded'] += summary['sent_rows']
+            self.stats['failed'] += summary['failed_rows']
+
+    def run(self, events: Iterator[Event]) -> Dict:
+        """处理事件直到事件流结束（回放）或被中断，返回统计信息"""
+        try:
+            for table, rows, position in events:
+                if rows and table == self.table_name:
+                    self.add_rows(rows)
+                if position:
+                    self.position = position
+                if len(self.buffer) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+                    self.flush()
+        finally:
+            self.flush()
+        return self.stats
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="读取 MySQL binlog 实时上报零售数据")
+    parser.add_argument('--config', default='config.json', help="配置文件路径")
+    parser.add_argument('--fixture', help="回放 --record 记录的事件文件，不连接 binlog")
+    parser.add_argument('--record', help="把读取到的行事件追加记录到该文件")
+    parser.add_argument('--dry-run', action='store_true', help="只转换和验证，不写入发件箱、不上报")
+    return parser.parse_args(argv)
+
+def run(args) -> int:
+    """启动实时上报，返回退出码"""
+    try:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except Exception as e:
+        logger.error(f"加载配置文件失败: {str(e)}")
+        return 2
+
+    api = None
+    if not args.dry_run:
+        api_config = config.get('api') or DEFAULT_API_CONFIG
+        upload_config = config.get('upload', {})
+        api = RetailAPI(api_config['url'], max_workers=upload_config.get('max_workers', 4),
+                        retry_config=config.get('retry'), upload_config=upload_config)
+        if not api.login(api_config['username'], api_config['password']):
+            logger.error("API登录失败")
+            return 3
+
+    cdc = None
+    try:
+        cdc = BinlogCDC(config, api, dry_run=args.dry_run)
+        if args.fixture:
+            logger.info(f"回放事件文件: {args.fixture}")
+            events = fixture_events(args.fixture)
+        else:
+            cdc_config = config.get('cdc', {})
+            position = cdc.start_position()
+            logger.info(f"开始读取 binlog: {cdc.position_key}，"
+                        + (f"从 {position['log_file']}:{position['log_pos']} 继续" if position
+                           else "从当前位置开始（启动前的数据由定时上报或补报处理）"))
+            events = binlog_events(config.get('database') or DEFAULT_DB_CONFIG, cdc.table_name,
+                                   cdc_config.get('server_id', 1001), position, cdc_config.get('heartbeat', 1))
+        if args.record:
+            events = record_events(events, args.record)
+        stats = cdc.run(events)
+    except KeyboardInterrupt:
+        logger.info("实时上报被手动终止")
+        if cdc is None:
+            return 0
+        stats = cdc.stats
+    except (ImportError, ValueError) as e:
+        logger.error(str(e))
+        return 2
+
+    logger.info(f"读取 {stats['rows']} 行，写入发件箱 {stats['queued']} 条，上报成功 {stats['uploaded']} 条，"
+                f"失败 {stats['failed']} 条，非当天数据 {stats['skipped']} 条，隔离 {stats['quarantined']} 条")
+    return 0
+
+def main(argv=None) -> int:
+    return run(parse_args(argv))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,7 +27,9 @@ CREATE TABLE IF NOT EXISTS retail_data (
     origin_code VARCHAR(10) DEFAULT '530000' COMMENT '原产地编码',
     origin_name VARCHAR(50) DEFAULT '云南省' COMMENT '原产地名称',
     scene_flag INT DEFAULT 1 COMMENT '采集场景',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间'
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    -- 上报查询按 report_date 过滤，增量模式下再按 id 范围读取（已有的表可用 index_cli.py 检查并创建）
+    INDEX idx_report_date_id (report_date, id)
 );
 
 -- 插入测试数据
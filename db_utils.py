@@ -1,11 +1,102 @@
 import mysql.connector
-from typing import List, Dict
-from datetime import datetime
+from mysql.connector import pooling, FieldType
+from typing import Callable, List, Dict, Iterator, Optional, Tuple, Any
+import hashlib
 import json
-from decimal import Decimal
+import os
+import threading
+import time
+
+# 增量查询时附加的水位列名，上报前需移除
+WATERMARK_FIELD = '_watermark'
+
+# api_config.json 不存在时使用的接口字段类型，未列出的字段按字符串处理
+DEFAULT_FIELD_TYPES = {
+    'reportDate': 'date',
+    'dataType': 'int',
+    'dataValue': 'float',
+    'dataConvertFlag': 'int',
+    'sceneflag': 'int'
+}
+
+# 按接口字段类型在SQL中完成的类型转换，查询结果无需在Python中逐个值转换
+SQL_TYPE_CASTS = {
+    'date': "DATE_FORMAT({}, '%Y-%m-%d')",
+    'datetime': "DATE_FORMAT({}, '%Y-%m-%d %T')",  # %T 即 %H:%i:%s，避免与参数占位符 %s 冲突
+    'float': "({} + 0E0)",  # DECIMAL 转为 DOUBLE，兼容不支持 CAST AS DOUBLE 的 MySQL 5.7
+    'int': "CAST({} AS SIGNED)"
+}
+
+# 表结构变化导致查询失败的错误码，出现时清除查询缓存
+SCHEMA_ERRORS = (mysql.connector.errorcode.ER_NO_SUCH_TABLE, mysql.connector.errorcode.ER_BAD_FIELD_ERROR)
+
+# 配置文件缓存：{路径: (修改时间, 内容)}，文件未修改时不重新解析
+_json_cache: Dict[str, Tuple[float, Any]] = {}
+
+# 已构建的查询缓存：{数据库+映射配置的哈希: 查询SQL}
+_query_cache: Dict[str, str] = {}
+# 已确认存在的数据表：{(数据库, 表名)}
+_known_tables = set()
+_cache_lock = threading.Lock()
+
+def _load_json(path: str) -> Any:
+    """读取JSON配置文件，文件修改时间未变化时返回缓存的内容"""
+    mtime = os.path.getmtime(path)
+    with _cache_lock:
+        cached = _json_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    with _cache_lock:
+        _json_cache[path] = (mtime, data)
+    return data
+
+def load_field_types(path: str = 'api_config.json') -> Dict[str, str]:
+    """读取 api_config.json 中各接口字段的类型，返回 {接口字段名: 类型}"""
+    if not os.path.exists(path):
+        return dict(DEFAULT_FIELD_TYPES)
+    try:
+        fields = _load_json(path).get('fields', [])
+        return {field['api_field']: field.get('type', 'string') for field in fields if field.get('api_field')}
+    except Exception as e:
+        print(f"加载接口字段类型失败: {str(e)}，使用默认字段类型")
+        return dict(DEFAULT_FIELD_TYPES)
+
+def load_table_mapping(path: str = 'config.json') -> Dict:
+    """读取 config.json 中的 table_mapping"""
+    return _load_json(path).get('table_mapping', {})
+
+def invalidate_query_cache():
+    """清除查询缓存和表存在检查结果（表结构变化时调用）"""
+    with _cache_lock:
+        _query_cache.clear()
+        _known_tables.clear()
+
+# 进程内共享的连接池，按连接参数区分
+_pools: Dict[str, pooling.MySQLConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_connection_pool(config: Dict, pool_size: int = 3) -> pooling.MySQLConnectionPool:
+    """获取（或创建）与连接参数对应的进程级连接池
+
+    已有的连接池小于 pool_size 时按新的大小重新创建（多门店或补报并发数较大时），
+    原连接池中的连接用完归还后随原连接池一起释放。
+    """
+    key = '|'.join(str(config.get(k)) for k in ('host', 'port', 'user', 'password', 'database'))
+    pool_name = f"retail_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}"
+    pool_size = min(max(1, pool_size), pooling.CNX_POOL_MAXSIZE)
+    with _pools_lock:
+        pool = _pools.get(pool_name)
+        if pool is None or pool.pool_size < pool_size:
+            print(f"创建数据库连接池: {config['host']}:{config['port']}/{config['database']} (大小 {pool_size})")
+            pool = pooling.MySQLConnectionPool(pool_name=pool_name, pool_size=pool_size, **config)
+            _pools[pool_name] = pool
+        return pool
 
 class DatabaseConnection:
-    def __init__(self, host: str, user: str, password: str, database: str, port: int = 3306):
+    def __init__(self, host: str, user: str, password: str, database: str, port: int = 3306,
+                 pool_size: int = 3):
         self.config = {
             'host': host,
             'user': user,
@@ -21,38 +112,29 @@ class DatabaseConnection:
             'connection_timeout': 10,
             'buffered': True
         }
+        self.pool_size = pool_size
         self.conn = None
         
     def test_connection(self) -> bool:
-        """测试数据库连接"""
+        """测试数据库连接
+        
+        从连接池获取连接并完成健康检查，成功后该连接保留给后续查询使用；
+        仅在数据库不存在时才单独建立连接创建数据库。
+        """
         try:
             print(f"尝试连接数据库: {self.config['host']}:{self.config['port']}")
             print(f"数据库名: {self.config['database']}")
             print(f"用户名: {self.config['user']}")
             
-            # 先尝试不带数据库名连接
-            test_config = self.config.copy()
-            test_config.pop('database', None)  # 移除数据库名
-            
-            test_conn = mysql.connector.connect(**test_config)
-            print("基础连接成功，检查数据库...")
-            
-            cursor = test_conn.cursor()
-            cursor.execute(f"SHOW DATABASES LIKE '{self.config['database']}'")
-            if not cursor.fetchone():
-                print(f"数据库 {self.config['database']} 不存在，尝试创建...")
-                cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.config['database']} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
-                test_conn.commit()
-                print("数据库创建成功")
+            try:
+                self.connect()
+            except mysql.connector.Error as err:
+                if err.errno != mysql.connector.errorcode.ER_BAD_DB_ERROR:
+                    raise
+                self._create_database()
+                self.connect()
                 
-            cursor.close()
-            test_conn.close()
-            
-            # 尝试连接到指定数据库
-            print("尝试连接到指定数据库...")
-            full_conn = mysql.connector.connect(**self.config)
             print("数据库连接测试完全成功")
-            full_conn.close()
             return True
             
         except mysql.connector.Error as err:
@@ -76,25 +158,72 @@ class DatabaseConnection:
             print("请检查MySQL服务是否正常运行")
             return False
             
+    def _create_database(self):
+        """数据库不存在时尝试创建"""
+        # 不带数据库名连接
+        test_config = self.config.copy()
+        test_config.pop('database', None)  # 移除数据库名
+        
+        test_conn = mysql.connector.connect(**test_config)
+        print("基础连接成功，检查数据库...")
+        
+        cursor = test_conn.cursor()
+        cursor.execute(f"SHOW DATABASES LIKE '{self.config['database']}'")
+        if not cursor.fetchone():
+            print(f"数据库 {self.config['database']} 不存在，尝试创建...")
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.config['database']} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+            test_conn.commit()
+            print("数据库创建成功")
+            
+        cursor.close()
+        test_conn.close()
+            
+    def _checkout(self, attempts: int = 10, delay: float = 0.5):
+        """从连接池取出连接，连接池已满时短暂等待"""
+        pool = get_connection_pool(self.config, self.pool_size)
+        for attempt in range(attempts):
+            try:
+                return pool.get_connection()
+            except mysql.connector.errors.PoolError:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(delay)
+            
     def connect(self):
-        """连接数据库"""
+        """从连接池获取数据库连接，取出时进行健康检查"""
         try:
-            if not self.conn or not self.conn.is_connected():
-                self.conn = mysql.connector.connect(**self.config)
-                self.conn.ping(reconnect=True, attempts=3, delay=5)
+            if not self.conn:
+                self.conn = self._checkout()
+                try:
+                    # 池中连接可能已被服务端断开，ping 失败时立即重连一次
+                    self.conn.ping(reconnect=True, attempts=1, delay=0)
+                except mysql.connector.Error:
+                    self.conn.close()
+                    self.conn = None
+                    raise
             print("数据库连接成功")
         except Exception as e:
             print(f"数据库连接失败: {str(e)}")
             raise
             
     def close(self):
-        """关闭数据库连接"""
-        if self.conn and self.conn.is_connected():
-            self.conn.close()
-            print("数据库连接已关闭")
+        """归还数据库连接到连接池"""
+        if self.conn:
+            try:
+                self.conn.close()
+                print("数据库连接已归还连接池")
+            finally:
+                self.conn = None
+            
+    def _database_key(self) -> str:
+        return f"{self.config['host']}:{self.config['port']}/{self.config['database']}"
             
-    def check_table_exists(self) -> bool:
-        """检查数据表是否存在"""
+    def check_table_exists(self, table_name: str = 'retail_data') -> bool:
+        """检查数据表是否存在，确认存在后缓存结果，不再重复查询"""
+        table_key = (self._database_key(), table_name)
+        with _cache_lock:
+            if table_key in _known_tables:
+                return True
         if not self.conn:
             self.connect()
             
@@ -104,15 +233,17 @@ class DatabaseConnection:
                 SELECT COUNT(*)
                 FROM information_schema.tables 
                 WHERE table_schema = %s 
-                AND table_name = 'retail_data'
-            """, (self.config['database'],))
+                AND table_name = %s
+            """, (self.config['database'], table_name))
             
             result = cursor.fetchone()[0]
             exists = bool(result)
             if exists:
-                print("数据表 retail_data 存在")
+                print(f"数据表 {table_name} 存在")
+                with _cache_lock:
+                    _known_tables.add(table_key)
             else:
-                print("数据表 retail_data 不存在")
+                print(f"数据表 {table_name} 不存在")
             return exists
         except Exception as e:
             print(f"检查数据表失败: {str(e)}")
@@ -120,73 +251,201 @@ class DatabaseConnection:
         finally:
             cursor.close()
             
-    def get_retail_data(self) -> List[Dict]:
-        """获取零售数据"""
+    def _build_retail_query(self, cursor, watermark_column: Optional[str] = None,
+                            since: Any = None, table_mapping: Optional[Dict] = None,
+                            field_types: Optional[Dict[str, str]] = None,
+                            report_date: Optional[str] = None) -> Tuple[str, tuple]:
+        """根据字段映射构建查询SQL
+        
+        table_mapping 为空时使用 config.json 中的 table_mapping。
+        只查询上报日期为 report_date（YYYY-MM-DD）的数据，默认为当天。
+        日期、数值字段按 field_types（默认读取 api_config.json）在SQL中转换为上报格式。
+        指定 watermark_column 时为增量查询：只取该列大于 since 的数据，
+        按该列升序返回，并额外返回 _watermark 列供调用方推进水位。
+        """
+        # 加载字段映射配置
+        mapping_config = table_mapping
+        if mapping_config is None:
+            mapping_config = load_table_mapping()
+        table_name = mapping_config.get('table_name', 'retail_data')
+        
+        # 验证表名
+        if not table_name or not table_name.replace('_', '').isalnum():
+            print(f"无效的表名: {table_name}，使用默认表名: retail_data")
+            table_name = 'retail_data'
+            
+        field_mappings = mapping_config.get('fields', {})
+        if not field_mappings:
+            raise ValueError("字段映射配置为空")
+        
+        # 验证表是否存在
+        cursor.execute(f"SHOW TABLES LIKE '{table_name}'")
+        if not cursor.fetchone():
+            print(f"表 {table_name} 不存在，使用默认表名: retail_data")
+            table_name = 'retail_data'
+        
+        # 动态构建SQL查询
+        if field_types is None:
+            field_types = load_field_types()
+        field_list = []
+        for db_field, api_field in field_mappings.items():
+            field_type = 'date' if db_field == 'report_date' else field_types.get(api_field, 'string')
+            cast = SQL_TYPE_CASTS.get(field_type, '{}')
+            field_list.append(f"{cast.format(db_field)} as {api_field}")
+            
+        if watermark_column:
+            if not watermark_column.replace('_', '').isalnum():
+                raise ValueError(f"无效的水位字段: {watermark_column}")
+            field_list.append(f"{watermark_column} as {WATERMARK_FIELD}")
+            
+        query = f"""
+            SELECT 
+                CONCAT('YN', DATE_FORMAT(report_date, '%Y%m%d'), LPAD(id, 6, '0')) as itemId,
+                {', '.join(field_list)}
+            FROM {table_name}
+            WHERE report_date = {'%s' if report_date else 'CURDATE()'}
+        """
+        params = (report_date,) if report_date else ()
+        if watermark_column:
+            if since is not None:
+                query += f" AND {watermark_column} > %s"
+                params += (since,)
+            query += f" ORDER BY {watermark_column}"
+        return query, params
+    
+    def compile_retail_query(self, watermark_column: Optional[str] = None, since: Any = None,
+                             table_mapping: Optional[Dict] = None,
+                             report_date: Optional[str] = None) -> Tuple[str, tuple]:
+        """获取查询SQL，映射配置和字段类型未变化时使用缓存的SQL
+        
+        缓存按数据库、映射配置、字段类型和水位字段的内容哈希区分，配置修改后自动使用新的SQL；
+        缓存命中时不再查询表是否存在，只执行数据查询。
+        """
+        if table_mapping is None:
+            table_mapping = load_table_mapping()
+        field_types = load_field_types()
+        key = hashlib.sha1(json.dumps(
+            [self._database_key(), table_mapping, field_types, watermark_column, since is None,
+             report_date is None],
+            sort_keys=True, ensure_ascii=False
+        ).encode('utf-8')).hexdigest()
+        params = (report_date,) if report_date else ()
+        if watermark_column and since is not None:
+            params += (since,)
+        
+        with _cache_lock:
+            query = _query_cache.get(key)
+        if query:
+            return query, params
+            
         if not self.conn:
             self.connect()
+        # 表名检查使用缓冲游标，避免与数据游标的未读结果冲突
+        check_cursor = self.conn.cursor(buffered=True)
+        try:
+            query, params = self._build_retail_query(check_cursor, watermark_column, since,
+                                                     table_mapping, field_types, report_date)
+        finally:
+            check_cursor.close()
+        with _cache_lock:
+            _query_cache[key] = query
+        return query, params
+            
+    @staticmethod
+    def _column_converters(description) -> Dict[str, Callable[[Any], Any]]:
+        """根据结果集的列类型，找出仍需在Python中转换的列
+        
+        类型转换已在SQL中完成时返回空字典，查询结果可直接上报；
+        通常只有未配置类型的 DECIMAL / 日期列和时间类型的水位列需要转换。
+        """
+        converters = {}
+        for column in description or ():
+            name, type_code = column[0], column[1]
+            if type_code in (FieldType.DECIMAL, FieldType.NEWDECIMAL):
+                converters[name] = float
+            elif type_code in (FieldType.DATETIME, FieldType.TIMESTAMP):
+                # 水位值需保留时间部分，否则按时间戳增量时会重复读取
+                fmt = '%Y-%m-%d %H:%M:%S' if name == WATERMARK_FIELD else '%Y-%m-%d'
+                converters[name] = lambda value, fmt=fmt: value.strftime(fmt)
+            elif type_code in (FieldType.DATE, FieldType.NEWDATE):
+                converters[name] = lambda value: value.strftime('%Y-%m-%d')
+        return converters
+        
+    @staticmethod
+    def _convert_rows(rows: List[Dict], converters: Dict[str, Callable[[Any], Any]]) -> List[Dict]:
+        """按列转换数据类型，跳过空值"""
+        for row in rows:
+            for name, convert in converters.items():
+                value = row.get(name)
+                if value is not None:
+                    row[name] = convert(value)
+        return rows
             
+    @staticmethod
+    def split_watermark(rows: List[Dict]) -> Tuple[List[Dict], Any]:
+        """移除数据中的 _watermark 列，返回 (上报数据, 本批最大水位)"""
+        watermark = None
+        for row in rows:
+            value = row.pop(WATERMARK_FIELD, None)
+            if value is not None and (watermark is None or value > watermark):
+                watermark = value
+        return rows, watermark
+            
+    def iter_retail_data(self, batch_size: int = 1000, watermark_column: Optional[str] = None,
+                         since: Any = None, table_mapping: Optional[Dict] = None,
+                         report_date: Optional[str] = None) -> Iterator[List[Dict]]:
+        """流式获取零售数据
+        
+        查询SQL见 compile_retail_query（按配置缓存SQL文本），使用非缓冲游标和 fetchmany 分批读取，每次产出一批已转换的数据，
+        内存占用只与 batch_size 有关，与当天数据总量无关。
+        类型转换在SQL中完成，结果集中没有需要转换的列时直接产出 fetchmany 的结果。
+        指定 watermark_column 时只读取水位 since 之后的数据；
+        table_mapping 为空时使用 config.json 中的字段映射；report_date 为空时读取当天的数据。
+        """
+        if not self.conn:
+            self.connect()
+            
+        query, params = self.compile_retail_query(watermark_column, since, table_mapping, report_date)
+        # 每次执行只发送一条文本查询；预处理语句随连接归还连接池时释放，无法跨执行复用
+        cursor = self.conn.cursor(dictionary=True, buffered=False)
         try:
-            # 加载字段映射配置
-            with open('config.json', 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                mapping_config = config.get('table_mapping', {})
-                table_name = mapping_config.get('table_name', 'retail_data')
-                
-                # 验证表名
-                if not table_name or not table_name.replace('_', '').isalnum():
-                    print(f"无效的表名: {table_name}，使用默认表名: retail_data")
-                    table_name = 'retail_data'
-                    
-                field_mappings = mapping_config.get('fields', {})
-                if not field_mappings:
-                    raise ValueError("字段映射配置为空")
-            
-            cursor = self.conn.cursor(dictionary=True)
-            
-            # 验证表是否存在
-            cursor.execute(f"SHOW TABLES LIKE '{table_name}'")
-            if not cursor.fetchone():
-                print(f"表 {table_name} 不存在，使用默认表名: retail_data")
-                table_name = 'retail_data'
-            
-            # 动态构建SQL查询
-            field_list = []
-            for db_field, api_field in field_mappings.items():
-                if db_field == 'report_date':
-                    field_list.append(f"DATE_FORMAT({db_field}, '%Y-%m-%d') as {api_field}")
-                else:
-                    field_list.append(f"{db_field} as {api_field}")
+            print(f"执行SQL查询: {query} 参数: {params}")  # 添加日志
+            try:
+                cursor.execute(query, params or None)
+            except mysql.connector.Error as err:
+                if err.errno not in SCHEMA_ERRORS:
+                    raise
+                # 表结构已变化：清除缓存，重新检查表名并构建SQL后重试一次
+                print(f"表结构已变化({err})，重新构建查询")
+                invalidate_query_cache()
+                query, params = self.compile_retail_query(watermark_column, since, table_mapping, report_date)
+                cursor.execute(query, params or None)
+            converters = self._column_converters(cursor.description)
+            if converters:
+                print(f"以下列需要转换类型: {', '.join(converters)}")
+            
+            total = 0
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                total += len(rows)
+                yield self._convert_rows(rows, converters) if converters else rows
                 
-            query = f"""
-                SELECT 
-                    CONCAT('YN', DATE_FORMAT(report_date, '%Y%m%d'), LPAD(id, 6, '0')) as itemId,
-                    {', '.join(field_list)}
-                FROM {table_name}
-                WHERE report_date = CURDATE()
-            """
-            
-            print(f"执行SQL查询: {query}")  # 添加日志
-            cursor.execute(query)
-            results = cursor.fetchall()
-            
-            # 处理数据类型
-            processed_results = []
-            for row in results:
-                processed_row = {}
-                for key, value in row.items():
-                    if isinstance(value, datetime):
-                        processed_row[key] = value.strftime('%Y-%m-%d')
-                    elif isinstance(value, Decimal):
-                        processed_row[key] = float(value)
-                    else:
-                        processed_row[key] = value
-                processed_results.append(processed_row)
-            
-            print(f"获取到 {len(processed_results)} 条数据")  # 添加日志
-            return processed_results
+            print(f"获取到 {total} 条数据")  # 添加日志
+        finally:
+            # 提前结束迭代时需先读完剩余结果，否则无法关闭游标
+            if self.conn.unread_result:
+                self.conn.consume_results()
+            cursor.close()
             
+    def get_retail_data(self) -> List[Dict]:
+        """获取零售数据"""
+        try:
+            results = []
+            for batch in self.iter_retail_data():
+                results.extend(batch)
+            return results
         except Exception as e:
             print(f"获取数据失败: {str(e)}")
             return []
-        finally:
-            cursor.close() 
\ No newline at end of file
@@ -2,20 +2,25 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QH
                            QPushButton, QTextEdit, QLabel, QMessageBox, QLineEdit,
                            QFormLayout, QTabWidget, QGroupBox, QTimeEdit, QCheckBox,
                            QTableWidget, QTableWidgetItem, QHeaderView, QDialog, QComboBox,
-                           QInputDialog, QSizeGrip, QFileDialog, QProgressBar, QDialogButtonBox)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QTime
+                           QInputDialog, QSizeGrip, QFileDialog, QProgressBar, QDialogButtonBox,
+                           QTableView, QDateEdit)
+from PyQt5.QtCore import (Qt, QThread, pyqtSignal, QTimer, QTime, QDate,
+                          QAbstractTableModel, QModelIndex)
+from PyQt5.QtGui import QColor
 from retail_api import RetailAPI
 from db_utils import DatabaseConnection
 from utils.logger import Logger
-from utils.validator import DataValidator
+from utils.history_store import HistoryStore
+from utils.import_pipeline import ImportPipeline, ImportCancelled, reader_options_from_config, upload_records
+from utils.file_reader import FILE_DIALOG_FILTER, read_excel_header
+from utils.template import create_import_template
+from main import upload_from_db
+from backfill import Backfill
 import sys
 import json
 import os
 import schedule
 import time
-from datetime import datetime
-import pandas as pd
-from openpyxl.styles import PatternFill, Font
 
 class WorkerThread(QThread):
     """后台工作线程，避免界面卡顿"""
@@ -24,39 +29,9 @@ class WorkerThread(QThread):
     refresh_history_signal = pyqtSignal()  # 添加刷新历史信号
 
     def save_history(self, status, data_count, message, error_detail=None):
-        """保存上报历史到JSON文件"""
+        """保存上报历史"""
         try:
-            history_file = 'upload_history.json'
-            history_data = []
-            
-            # 读取现有历史记录
-            if os.path.exists(history_file):
-                try:
-                    with open(history_file, 'r', encoding='utf-8') as f:
-                        history_data = json.load(f)
-                except:
-                    history_data = []
-            
-            # 添加新记录
-            new_record = {
-                'upload_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'status': status,
-                'data_count': data_count,
-                'message': message,
-                'error_detail': error_detail,
-                'source': '接口导入'  # 添加数据来源标识
-            }
-            
-            # 将新记录添加到开头
-            history_data.insert(0, new_record)
-            
-            # 只保留最近100条记录
-            history_data = history_data[:100]
-            
-            # 保存到文件
-            with open(history_file, 'w', encoding='utf-8') as f:
-                json.dump(history_data, f, indent=4, ensure_ascii=False)
-                
+            HistoryStore().add(status, data_count, message, error_detail, source='接口导入')
         except Exception as e:
             print(f"保存历史记录失败: {str(e)}")
     
@@ -68,8 +43,11 @@ class WorkerThread(QThread):
             with open('config.json', 'r', encoding='utf-8') as f:
                 config = json.load(f)
             
+            upload_config = config.get('upload', {})
+            
             # 初始化API客户端
-            api = RetailAPI(config['api']['url'])
+            api = RetailAPI(config['api']['url'], max_workers=upload_config.get('max_workers', 4),
+                            retry_config=config.get('retry'), upload_config=upload_config)
             
             # 登录系统
             self.update_signal.emit("正在登录系统...")
@@ -78,59 +56,45 @@ class WorkerThread(QThread):
                 return
             
             self.update_signal.emit("正在获取数据...")
-            # 获取数据
-            db = DatabaseConnection(**config['database'])
-            
-            if not db.test_connection():
-                self.finished_signal.emit(False, "数据库连接失败")
-                return
-                
-            if not db.check_table_exists():
-                self.finished_signal.emit(False, "数据表不存在")
-                return
-                
-            data = db.get_retail_data()
-            
-            # 数据验证
-            self.update_signal.emit("正在验证数据...")
-            failed_records = DataValidator.validate_batch_data(data)
-            if failed_records:
-                error_msg = "数据验证失败:\n"
-                for record in failed_records:
-                    error_msg += f"数据: {record['data']}\n错误: {record['error']}\n"
-                self.finished_signal.emit(False, error_msg)
-                return
-                
-            if not data:
+            # 流式读取数据写入发件箱，读取完成后再上报
+            summary = upload_from_db(api, config, config['database'], log=self.update_signal.emit)
+            content = summary['content']
+            uploaded_count = summary['uploaded']
+            failed_count = summary['failed']
+            errors = summary['errors']
+            if summary['pending']:
+                self.update_signal.emit(f"发件箱中仍有 {summary['pending']} 批数据等待重试")
+                    
+            if not uploaded_count and not failed_count and not summary['db_error']:
                 self.finished_signal.emit(False, "没有获取到需要上报的数据")
                 return
                 
-            # 上报数据
-            self.update_signal.emit("正在上报数据...")
-            result = api.upload_retail_data(data)
-            if result and result.get("code") == 200:
+            if not errors:
                 success_msg = "数据上报成功\n"
-                for item in result.get("content", []):
+                for item in content:
                     success_msg += f"数据ID: {item['soureId']}, 状态: {item['code']}, 消息: {item['msg']}\n"
                 self.finished_signal.emit(True, success_msg)
                 # 保存成功历史
                 self.save_history(
                     status='成功',
-                    data_count=len(data),
-                    message=str(result.get("content", [])),
+                    data_count=uploaded_count,
+                    message=str(content),
                     error_detail=None
                 )
-                # 发送刷新历史信号
-                self.refresh_history_signal.emit()
             else:
-                self.finished_signal.emit(False, f"数据上报失败: {str(result)}")
+                self.finished_signal.emit(
+                    False,
+                    f"数据上报失败: 成功 {uploaded_count} 条，失败 {failed_count} 条\n" + "\n".join(errors)
+                )
                 # 保存失败历史
                 self.save_history(
                     status='失败',
-                    data_count=len(data),
+                    data_count=uploaded_count + failed_count,
                     message="上报失败",
-                    error_detail=str(result)
+                    error_detail="\n".join(errors)
                 )
+            # 发送刷新历史信号
+            self.refresh_history_signal.emit()
                 
         except Exception as e:
             self.finished_signal.emit(False, f"执行出错: {str(e)}")
@@ -141,9 +105,110 @@ class WorkerThread(QThread):
                 message="执行出错",
                 error_detail=str(e)
             )
-        finally:
-            if 'db' in locals():
-                db.close()
+
+class UploadThread(QThread):
+    """后台上报线程，上报导入数据时不阻塞界面
+    
+    config.json 中 upload.transport 为 async 且已安装 httpx 时使用异步客户端
+    在一个事件循环中并发上报各批次，否则使用同步客户端的线程池分批上报。
+    """
+    finished_signal = pyqtSignal(object)  # 上报结果
+    error_signal = pyqtSignal(str)  # 错误信息
+    
+    def __init__(self, config, data, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.data = data
+        
+    def run(self):
+        try:
+            self.finished_signal.emit(upload_records(self.config, self.data))
+        except Exception as e:
+            self.error_signal.emit(str(e))
+
+class BackfillThread(QThread):
+    """后台补报线程，按天补报指定日期范围的数据"""
+    update_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool, str)
+    refresh_history_signal = pyqtSignal()
+    
+    def __init__(self, start, end, parent=None):
+        super().__init__(parent)
+        self.start_date = start
+        self.end_date = end
+        self.backfill = None
+        
+    def cancel(self):
+        """正在补报的日期完成后停止"""
+        if self.backfill:
+            self.backfill.cancel()
+        
+    def run(self):
+        try:
+            with open('config.json', 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            self.backfill = Backfill(config, self.start_date, self.end_date)
+            pending = self.backfill.pending_dates()
+            self.update_signal.emit(
+                f"补报 {self.start_date} 至 {self.end_date}，共 {len(self.backfill.dates)} 天，"
+                f"待补报 {len(pending)} 天（已完成的日期将跳过）"
+            )
+            
+            def on_finished(day, status):
+                if status.get('state') == '完成':
+                    self.update_signal.emit(f"{day}: 完成，上报 {status.get('uploaded', 0)} 条")
+                else:
+                    self.update_signal.emit(
+                        f"{day}: 失败，成功 {status.get('uploaded', 0)} 条，失败 {status.get('failed', 0)} 条"
+                        + (f"，{status['error']}" if status.get('error') else "")
+                    )
+                self.refresh_history_signal.emit()
+                
+            result = self.backfill.run(on_finished)
+            unfinished = [day for day, status in result.items() if status.get('state') != '完成']
+            if unfinished:
+                self.finished_signal.emit(False, f"补报未完成的日期: {', '.join(unfinished)}，再次补报同一范围可继续")
+            else:
+                self.finished_signal.emit(True, "补报完成")
+        except Exception as e:
+            self.finished_signal.emit(False, f"补报出错: {str(e)}")
+
+class ImportThread(QThread):
+    """后台导入线程，读取和转换大文件时界面仍可操作"""
+    progress_signal = pyqtSignal(int, str)  # 进度百分比和当前阶段
+    finished_signal = pyqtSignal(object)  # 导入结果
+    error_signal = pyqtSignal(str)  # 错误信息
+    cancelled_signal = pyqtSignal()  # 导入已取消
+    
+    def __init__(self, path, mapping_name, validation, reader_options=None, report_date=None, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.mapping_name = mapping_name
+        self.validation = validation
+        self.reader_options = reader_options
+        self.report_date = report_date
+        self._cancelled = False
+        
+    def cancel(self):
+        """请求取消导入，当前数据块处理完后停止"""
+        self._cancelled = True
+        
+    def run(self):
+        try:
+            pipeline = ImportPipeline(
+                self.path,
+                self.mapping_name,
+                self.validation,
+                progress=self.progress_signal.emit,
+                is_cancelled=lambda: self._cancelled,
+                reader_options=self.reader_options,
+                report_date=self.report_date
+            )
+            self.finished_signal.emit(pipeline.run())
+        except ImportCancelled:
+            self.cancelled_signal.emit()
+        except Exception as e:
+            self.error_signal.emit(str(e))
 
 class ConfigTab(QWidget):
     def __init__(self, parent=None):
@@ -290,7 +355,11 @@ class ConfigTab(QWidget):
             }
             
             db = DatabaseConnection(**db_config)
-            if db.test_connection():
+            try:
+                success = db.test_connection()
+            finally:
+                db.close()
+            if success:
                 QMessageBox.information(self, "成功", "数据库连接测试成功！")
             else:
                 QMessageBox.warning(self, "错误", "数据库连接测试失败！")
@@ -301,7 +370,7 @@ class ConfigTab(QWidget):
         """测试API连接"""
         try:
             api = RetailAPI(self.api_url.text())
-            if api.login(self.api_username.text(), self.api_password.text()):
+            if api.login(self.api_username.text(), self.api_password.text(), force=True):
                 QMessageBox.information(self, "成功", "API连接测试成功！")
             else:
                 QMessageBox.warning(self, "错误", "API连接测试失败！")
@@ -321,7 +390,10 @@ class ConfigTab(QWidget):
             }
             
             db = DatabaseConnection(**db_config)
-            db_success = db.test_connection()
+            try:
+                db_success = db.test_connection()
+            finally:
+                db.close()
         except Exception as e:
             db_success = False
             db_error = str(e)
@@ -329,7 +401,7 @@ class ConfigTab(QWidget):
         # 测试API连接
         try:
             api = RetailAPI(self.api_url.text())
-            api_success = api.login(self.api_username.text(), self.api_password.text())
+            api_success = api.login(self.api_username.text(), self.api_password.text(), force=True)
         except Exception as e:
             api_success = False
             api_error = str(e)
@@ -375,7 +447,16 @@ class ConfigTab(QWidget):
                 
     def saveConfig(self):
         """保存配置到文件"""
-        config = {
+        # 保留配置文件中的其他配置项（字段映射、上报参数等）
+        config = {}
+        if os.path.exists('config.json'):
+            try:
+                with open('config.json', 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+            except Exception:
+                config = {}
+        
+        config.update({
             'database': {
                 'host': self.db_host.text(),
                 'port': int(self.db_port.text() or 3306),
@@ -388,7 +469,7 @@ class ConfigTab(QWidget):
                 'username': self.api_username.text(),
                 'password': self.api_password.text()
             }
-        }
+        })
         
         try:
             with open('config.json', 'w', encoding='utf-8') as f:
@@ -557,9 +638,131 @@ class ScheduleTab(QWidget):
         else:
             self.next_run_label.setText("-")
 
+class HistoryTableModel(QAbstractTableModel):
+    """上报历史表格模型
+
+    按页从 HistoryStore 读取记录，滚动到底部时再加载下一页（canFetchMore / fetchMore），
+    过滤条件在数据库中执行；新记录通过 append_new 插入到表格顶部，无需整表重新加载。
+    """
+    HEADERS = ['上报时间', '状态', '数据条数', '结果消息', '错误详情', '数据来源']
+    FIELDS = ['upload_time', 'status', 'data_count', 'message', 'error_detail', 'source']
+
+    def __init__(self, store: HistoryStore, page_size: int = 200, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.page_size = page_size
+        self.filters = {}
+        self.records = []
+        self.total = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.records[index.row()]
+        field = self.FIELDS[index.column()]
+        if role == Qt.DisplayRole:
+            value = record[field]
+            return '' if value is None else str(value)
+        if role == Qt.ForegroundRole and field == 'status':
+            return QColor(Qt.darkGreen if record['status'] == '成功' else Qt.red)
+        if role == Qt.ToolTipRole and field in ('message', 'error_detail'):
+            return record[field]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def set_filters(self, **filters):
+        """按新的过滤条件重新加载第一页"""
+        self.beginResetModel()
+        self.filters = filters
+        self.total = self.store.count(**filters)
+        self.records = self.store.query(limit=self.page_size, **filters)
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and len(self.records) < self.total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.records:
+            return
+        # 按记录ID翻页，期间新增的记录不会造成重复或遗漏
+        rows = self.store.query(limit=self.page_size, before_id=self.records[-1]['id'], **self.filters)
+        if not rows:
+            self.total = len(self.records)
+            return
+        self.beginInsertRows(QModelIndex(), len(self.records), len(self.records) + len(rows) - 1)
+        self.records.extend(rows)
+        self.endInsertRows()
+
+    def append_new(self) -> int:
+        """把比当前最新记录更新的记录插入到顶部，返回新增条数"""
+        if not self.records:
+            self.set_filters(**self.filters)
+            return len(self.records)
+        rows = self.store.query(limit=self.page_size, after_id=self.records[0]['id'], **self.filters)
+        if rows:
+            self.beginInsertRows(QModelIndex(), 0, len(rows) - 1)
+            self.records[0:0] = rows
+            self.total += len(rows)
+            self.endInsertRows()
+        return len(rows)
+
+class DataFrameModel(QAbstractTableModel):
+    """基于 pandas DataFrame 的只读表格模型
+
+    每列只转换一次为数组，单元格文本在视图绘制时按需生成，
+    预览耗时只与可见行数有关，不会把整个 DataFrame 转成字符串。
+    """
+    def __init__(self, df=None, parent=None):
+        super().__init__(parent)
+        self.set_dataframe(df)
+
+    def set_dataframe(self, df):
+        """替换显示的数据"""
+        self.beginResetModel()
+        if df is None:
+            self._headers, self._columns, self._rows = [], [], 0
+        else:
+            self._headers = [str(column) for column in df.columns]
+            self._columns = [df.iloc[:, j].to_numpy() for j in range(df.shape[1])]
+            self._rows = len(df)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        value = self._columns[index.column()][index.row()]
+        if value is None or (isinstance(value, float) and value != value):  # 空值和NaN显示为空
+            return ''
+        return str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._headers[section]
+        return str(section + 1)
+
 class HistoryTab(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.store = HistoryStore()
+        self.model = HistoryTableModel(self.store, parent=self)
         self.initUI()
         
     def initUI(self):
@@ -571,17 +774,46 @@ class HistoryTab(QWidget):
         title_label.setStyleSheet('font-size: 16px; font-weight: bold; margin: 10px;')
         layout.addWidget(title_label)
         
+        # 过滤条件
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel('状态:'))
+        self.status_combo = QComboBox()
+        self.status_combo.addItems(['全部', '成功', '失败'])
+        filter_layout.addWidget(self.status_combo)
+        
+        filter_layout.addWidget(QLabel('数据来源:'))
+        self.source_combo = QComboBox()
+        filter_layout.addWidget(self.source_combo)
+        
+        self.date_check = QCheckBox('上报日期:')
+        filter_layout.addWidget(self.date_check)
+        self.start_date = QDateEdit(QDate.currentDate().addDays(-7))
+        self.start_date.setCalendarPopup(True)
+        self.start_date.setDisplayFormat('yyyy-MM-dd')
+        filter_layout.addWidget(self.start_date)
+        filter_layout.addWidget(QLabel('至'))
+        self.end_date = QDateEdit(QDate.currentDate())
+        self.end_date.setCalendarPopup(True)
+        self.end_date.setDisplayFormat('yyyy-MM-dd')
+        filter_layout.addWidget(self.end_date)
+        
+        query_button = QPushButton('查询')
+        query_button.clicked.connect(self.apply_filters)
+        filter_layout.addWidget(query_button)
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+        
         # 创建表格
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels(['上报时间', '状态', '数据条数', '结果消息', '错误详情', '数据来源', '记录时间'])
+        self.table = QTableView()
+        self.table.setModel(self.model)
         
         # 设置表格样式
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
         self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setVisible(False)
         self.table.setAlternatingRowColors(True)
         self.table.setStyleSheet('''
-            QTableWidget {
+            QTableView {
                 gridline-color: #d0d0d0;
                 background-color: white;
                 alternate-background-color: #f6f6f6;
@@ -596,9 +828,14 @@ class HistoryTab(QWidget):
         
         layout.addWidget(self.table)
         
+        bottom_layout = QHBoxLayout()
+        self.count_label = QLabel()
+        bottom_layout.addWidget(self.count_label)
+        bottom_layout.addStretch()
+        
         # 添加刷新按钮
         refresh_button = QPushButton('刷新历史记录')
-        refresh_button.clicked.connect(self.refresh_history)
+        refresh_button.clicked.connect(self.apply_filters)
         refresh_button.setStyleSheet('''
             QPushButton {
                 background-color: #2196F3;
@@ -612,42 +849,55 @@ class HistoryTab(QWidget):
                 background-color: #1976D2;
             }
         ''')
-        layout.addWidget(refresh_button, alignment=Qt.AlignRight)
+        bottom_layout.addWidget(refresh_button)
+        layout.addLayout(bottom_layout)
         
         self.setLayout(layout)
         
         # 初始加载数据
-        self.refresh_history()
+        self.apply_filters()
+        
+    def load_sources(self):
+        """刷新数据来源下拉框，保留当前选择"""
+        current = self.source_combo.currentText()
+        self.source_combo.blockSignals(True)
+        self.source_combo.clear()
+        self.source_combo.addItem('全部')
+        self.source_combo.addItems(self.store.sources())
+        index = self.source_combo.findText(current)
+        self.source_combo.setCurrentIndex(max(index, 0))
+        self.source_combo.blockSignals(False)
+        
+    def current_filters(self) -> dict:
+        """当前界面上的过滤条件"""
+        filters = {}
+        if self.status_combo.currentText() != '全部':
+            filters['status'] = self.status_combo.currentText()
+        if self.source_combo.currentText() not in ('', '全部'):
+            filters['source'] = self.source_combo.currentText()
+        if self.date_check.isChecked():
+            filters['start'] = self.start_date.date().toString('yyyy-MM-dd') + ' 00:00:00'
+            filters['end'] = self.end_date.date().toString('yyyy-MM-dd') + ' 23:59:59'
+        return filters
+        
+    def update_count(self):
+        self.count_label.setText(f"共 {self.model.total} 条记录，已加载 {self.model.rowCount()} 条")
+        
+    def apply_filters(self):
+        """按过滤条件重新查询"""
+        try:
+            self.load_sources()
+            self.model.set_filters(**self.current_filters())
+            self.update_count()
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"加载历史记录失败: {str(e)}")
         
     def refresh_history(self):
-        """刷新历史记录"""
+        """上报完成后只追加新记录"""
         try:
-            history_file = 'upload_history.json'
-            if not os.path.exists(history_file):
-                return
-                
-            with open(history_file, 'r', encoding='utf-8') as f:
-                history_data = json.load(f)
-            
-            # 清空表格
-            self.table.setRowCount(0)
-            
-            # 填充数据
-            for row_num, row in enumerate(history_data):
-                self.table.insertRow(row_num)
-                
-                # 设置单元格内容
-                self.table.setItem(row_num, 0, QTableWidgetItem(row['upload_time']))
-                
-                status_item = QTableWidgetItem(row['status'])
-                status_item.setForeground(Qt.green if row['status'] == '成功' else Qt.red)
-                self.table.setItem(row_num, 1, status_item)
-                
-                self.table.setItem(row_num, 2, QTableWidgetItem(str(row['data_count'])))
-                self.table.setItem(row_num, 3, QTableWidgetItem(row['message']))
-                self.table.setItem(row_num, 4, QTableWidgetItem(row['error_detail'] or ''))
-                self.table.setItem(row_num, 5, QTableWidgetItem(row.get('source', '接口导入')))  # 显示数据来源
-                
+            if self.model.append_new():
+                self.load_sources()
+            self.update_count()
         except Exception as e:
             QMessageBox.warning(self, "错误", f"加载历史记录失败: {str(e)}")
 
@@ -1422,14 +1672,14 @@ class ImportTab(QWidget):
         layout.addWidget(template_button, alignment=Qt.AlignRight)
         
         # 文件选择区域
-        file_group = QGroupBox("Excel文件导入")
+        file_group = QGroupBox("数据文件导入")
         file_layout = QVBoxLayout()
         
         # 文件路径显示和选择按钮
         file_select_layout = QHBoxLayout()
         self.file_path = QLineEdit()
         self.file_path.setReadOnly(True)
-        self.file_path.setPlaceholderText("请选择Excel文件...")
+        self.file_path.setPlaceholderText("请选择Excel、CSV或Parquet文件...")
         
         select_button = QPushButton("选择文件")
         select_button.clicked.connect(self.select_file)
@@ -1454,11 +1704,24 @@ class ImportTab(QWidget):
         self.progress_bar.setVisible(False)
         
         # 预览表格
-        self.preview_table = QTableWidget()
-        self.preview_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.preview_model = DataFrameModel(parent=self)
+        self.preview_table = QTableView()
+        self.preview_table.setModel(self.preview_model)
+        self.preview_table.setEditTriggers(QTableView.NoEditTriggers)
+        
+        # 导入进度说明和取消按钮
+        progress_layout = QHBoxLayout()
+        self.progress_label = QLabel()
+        self.progress_label.setVisible(False)
+        self.cancel_button = QPushButton("取消导入")
+        self.cancel_button.clicked.connect(self.cancel_import)
+        self.cancel_button.setVisible(False)
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.progress_label)
+        progress_layout.addWidget(self.cancel_button)
         
         file_layout.addLayout(file_select_layout)
-        file_layout.addWidget(self.progress_bar)
+        file_layout.addLayout(progress_layout)
         file_layout.addWidget(self.preview_table)
         
         file_group.setLayout(file_layout)
@@ -1543,20 +1806,29 @@ class ImportTab(QWidget):
         
         mapping_layout.addWidget(QLabel("选择映射配置:"))
         mapping_layout.addWidget(self.mapping_combo)
+        
+        # 只导入指定上报日期的数据（大文件按日期过滤，Parquet 文件在读取时过滤）
+        self.date_filter_check = QCheckBox("只导入上报日期:")
+        self.report_date_edit = QDateEdit(QDate.currentDate())
+        self.report_date_edit.setCalendarPopup(True)
+        self.report_date_edit.setDisplayFormat('yyyy-MM-dd')
+        mapping_layout.addWidget(self.date_filter_check)
+        mapping_layout.addWidget(self.report_date_edit)
         layout.addLayout(mapping_layout)
         
         self.setLayout(layout)
         
         # 存储导入的数据
         self.imported_data = None
+        self.import_thread = None
         
     def select_file(self):
-        """选择Excel文件"""
+        """选择Excel、CSV或Parquet文件"""
         file_path, _ = QFileDialog.getOpenFileName(
             self,
-            "选择Excel文件",
+            "选择数据文件",
             "",
-            "Excel Files (*.xlsx *.xls)"
+            FILE_DIALOG_FILTER
         )
         
         if file_path:
@@ -1573,144 +1845,104 @@ class ImportTab(QWidget):
         except:
             pass
             
-    def import_data(self):
-        """导入Excel数据"""
+    def load_validation_config(self):
+        """加载数据验证配置"""
         try:
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setValue(0)
+            with open('config.json', 'r', encoding='utf-8') as f:
+                return json.load(f).get('validation', {})
+        except Exception:
+            return {}
             
-            # 读取Excel文件
-            df = pd.read_excel(self.file_path.text())
+    def load_reader_options(self):
+        """加载文件读取配置"""
+        try:
+            with open('config.json', 'r', encoding='utf-8') as f:
+                return reader_options_from_config(json.load(f))
+        except Exception:
+            return {}
             
-            # 处理列名，移除API字段名提示
-            df.columns = df.columns.map(lambda x: x.split(' (')[0] if ' (' in x else x)
-            
-            # 打印原始列名用于调试
-            print("原始列名:", df.columns.tolist())
-            
-            # 获取选择的映射配置
-            mapping_name = self.mapping_combo.currentText()
-            
-            # 设置默认映射关系
-            field_mapping = {
-                '统一社会信用代码': 'socialCreditCode',
-                '企业名称': 'compName',
-                '零售点编码': 'retailStoreCode',
-                '零售点名称': 'retailStoreName',
-                '上报日期': 'reportDate',
-                '商品编码': 'selfCommondityCode',
-                '商品名称': 'selfCommondityName',
-                '单位': 'unit',
-                '规格': 'spec',
-                '条码': 'barcode',
-                '数据类型': 'dataType',
-                '数据值': 'dataValue',
-                '转换标志': 'dataConvertFlag',
-                '供应商编码': 'supplierCode',
-                '供应商名称': 'supplierName',
-                '生产商名称': 'manufatureName',
-                '产地编码': 'originCode',
-                '产地名称': 'originName',
-                '场景标志': 'sceneflag'
-            }
-            
-            # 如果不是默认映射，则加载自定义映射配置
-            if mapping_name != "默认映射":
-                try:
-                    with open('excel_mapping_history.json', 'r', encoding='utf-8') as f:
-                        mappings = json.load(f)
-                        for config in mappings['configurations']:
-                            if config['name'] == mapping_name:
-                                field_mapping = config['mappings']
-                                break
-                except Exception as e:
-                    print(f"加载自定义映射配置失败: {str(e)}")
-                    # 如果加载失败，继续使用默认映射
-            
-            # 使用映射配置重命名列
-            df = df.rename(columns=field_mapping)
-            
-            # 打印映射后的名用于调试
-            print("映射后的列名:", df.columns.tolist())
-            
-            # 验证必要字段
-            required_fields = {
-                'socialCreditCode': '统一社会信用代码',
-                'compName': '企业名称',
-                'retailStoreCode': '零售点编码',
-                'retailStoreName': '零售点名称',
-                'reportDate': '上报日期',
-                'selfCommondityCode': '商品编码',
-                'selfCommondityName': '商品名称',
-                'dataType': '数据类型',
-                'dataValue': '数据值',
-                'dataConvertFlag': '转换标志',
-                'supplierCode': '供应商编码',
-                'supplierName': '供应商名称',
-                'manufatureName': '生产商名称',
-                'originCode': '产地编码',
-                'originName': '产地名称',
-                'sceneflag': '场��标志'
-            }
-            
-            # 检查字段是否存在
-            missing_fields = []
-            for field, field_name in required_fields.items():
-                if field not in df.columns:
-                    missing_fields.append(field_name)
-                    print(f"缺少字段: {field_name} ({field})")  # 调试信息
-                    
-            if missing_fields:
-                QMessageBox.warning(self, "错误", f"缺少必要字段：{', '.join(missing_fields)}")
-                return
-                
-            # 数据类型转换和验证
-            try:
-                # 转换日期格式
-                df['reportDate'] = pd.to_datetime(df['reportDate']).dt.strftime('%Y-%m-%d')
-                
-                # 确保数值字段为数字类型
-                df['dataType'] = df['dataType'].astype(int)
-                df['dataValue'] = df['dataValue'].astype(float)
-                df['dataConvertFlag'] = df['dataConvertFlag'].astype(int)
-                df['sceneflag'] = df['sceneflag'].astype(int)
-                
-                # 生成itemId
-                df['itemId'] = 'YN' + df['reportDate'].str.replace('-', '') + df.index.astype(str).str.zfill(6)
-                
-            except Exception as e:
-                QMessageBox.warning(self, "错误", f"数据格式转换失败: {str(e)}")
-                return
-                
-            # 更新进度条
-            self.progress_bar.setValue(30)
-            
-            # 显示预览
-            self.preview_table.setRowCount(len(df))
-            self.preview_table.setColumnCount(len(df.columns))
-            self.preview_table.setHorizontalHeaderLabels(df.columns)
-            
-            for i in range(len(df)):
-                for j in range(len(df.columns)):
-                    value = str(df.iloc[i, j])
-                    self.preview_table.setItem(i, j, QTableWidgetItem(value))
-                    
-            # 存储导入的数据
-            self.imported_data = df.to_dict('records')
+    def import_data(self):
+        """在后台线程中导入Excel数据"""
+        if self.import_thread and self.import_thread.isRunning():
+            return
             
-            # 更新进度条
-            self.progress_bar.setValue(100)
+        self.import_button.setEnabled(False)
+        self.upload_button.setEnabled(False)
+        self.imported_data = None
+        self.preview_model.set_dataframe(None)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.progress_label.setText("")
+        self.progress_label.setVisible(True)
+        self.cancel_button.setEnabled(True)
+        self.cancel_button.setVisible(True)
+        
+        self.import_thread = ImportThread(
+            self.file_path.text(),
+            self.mapping_combo.currentText(),
+            self.load_validation_config(),
+            self.load_reader_options(),
+            self.report_date_edit.date().toString('yyyy-MM-dd') if self.date_filter_check.isChecked() else None
+        )
+        self.import_thread.progress_signal.connect(self.on_import_progress)
+        self.import_thread.finished_signal.connect(self.on_import_finished)
+        self.import_thread.error_signal.connect(self.on_import_error)
+        self.import_thread.cancelled_signal.connect(self.on_import_cancelled)
+        self.import_thread.finished.connect(self.on_import_done)
+        self.import_thread.start()
+        
+    def cancel_import(self):
+        """取消正在进行的导入"""
+        if self.import_thread and self.import_thread.isRunning():
+            self.import_thread.cancel()
+            self.cancel_button.setEnabled(False)
+            self.progress_label.setText("正在取消...")
+            
+    def on_import_progress(self, percent, message):
+        """更新导入进度"""
+        self.progress_bar.setValue(percent)
+        self.progress_label.setText(message)
+        
+    def on_import_finished(self, result):
+        """导入完成，显示预览"""
+        df = result['df']
+        if result['failed_rows']:
+            QMessageBox.warning(
+                self, "提示",
+                f"{len(result['failed_rows'])} 行数据验证失败，已写入隔离区(quarantine目录)，"
+                f"其余 {len(df)} 行继续导入：\n{result['details']}"
+            )
+        if df.empty:
+            return
             
-            # 启用上报按钮
+        # 显示预览，只渲染可见的单元格
+        self.preview_model.set_dataframe(df)
+        
+        # 存储导入的数据
+        self.imported_data = result['records']
+        
+        # 启用上报按钮
+        self.upload_button.setEnabled(True)
+        
+        QMessageBox.information(self, "成功", f"成功导入 {len(df)} 条数据！")
+        
+    def on_import_error(self, error):
+        """导入失败"""
+        QMessageBox.warning(self, "错误", f"导入失败: {error}")
+        
+    def on_import_cancelled(self):
+        """导入已取消"""
+        QMessageBox.information(self, "提示", "导入已取消")
+        
+    def on_import_done(self):
+        """导入线程结束，恢复界面状态"""
+        self.progress_bar.setVisible(False)
+        self.progress_label.setVisible(False)
+        self.cancel_button.setVisible(False)
+        self.import_button.setEnabled(True)
+        if self.imported_data:
             self.upload_button.setEnabled(True)
             
-            QMessageBox.information(self, "成功", f"成功导入 {len(df)} 条数据！")
-            
-        except Exception as e:
-            QMessageBox.warning(self, "错误", f"导入失败: {str(e)}")
-        finally:
-            self.progress_bar.setVisible(False)
-            
     def upload_data(self):
         """上报导入的数据"""
         if not self.imported_data:
@@ -1727,87 +1959,68 @@ class ImportTab(QWidget):
         
         if reply == QMessageBox.Yes:
             try:
-                # 初始化API客户端
                 with open('config.json', 'r', encoding='utf-8') as f:
                     config = json.load(f)
-                    
-                api = RetailAPI(config['api']['url'])
-                if not api.login(config['api']['username'], config['api']['password']):
-                    QMessageBox.warning(self, "错误", "API登录失败！")
-                    return
-                    
-                # 上报数据
-                result = api.upload_retail_data(self.imported_data)
-                
-                if result and result.get("code") == 200:
-                    QMessageBox.information(self, "成功", "数据上报成功！")
-                    # 保存成功历史
-                    self.save_history(
-                        status='成功',
-                        data_count=len(self.imported_data),
-                        message=str(result.get("content", [])),
-                        error_detail=None,
-                        source='Excel导入'
-                    )
-                    # 刷新历史记录
-                    if self.main_window:
-                        self.main_window.refresh_history()
-                else:
-                    QMessageBox.warning(self, "错误", f"上报失败: {str(result)}")
-                    # 保存失败历史
-                    self.save_history(
-                        status='失败',
-                        data_count=len(self.imported_data),
-                        message="上报失败",
-                        error_detail=str(result),
-                        source='Excel导入'  # 添加数据来源标识
-                    )
-                    
             except Exception as e:
-                QMessageBox.warning(self, "错误", f"上报失败: {str(e)}")
-                # 保存错误历史
-                self.save_history(
-                    status='失败',
-                    data_count=0,
-                    message="执行出错",
-                    error_detail=str(e),
-                    source='Excel导入'  # 添加数据来源标识
-                )
+                QMessageBox.warning(self, "错误", f"加载配置文件失败: {str(e)}")
+                return
+                
+            # 在后台线程中上报，避免界面卡顿
+            self.upload_button.setEnabled(False)
+            self.upload_button.setText("正在上报...")
+            self.upload_thread = UploadThread(config, self.imported_data)
+            self.upload_thread.finished_signal.connect(self.on_upload_finished)
+            self.upload_thread.error_signal.connect(self.on_upload_error)
+            self.upload_thread.start()
+            
+    def on_upload_finished(self, result):
+        """上报完成"""
+        self.upload_button.setEnabled(True)
+        self.upload_button.setText("上报数据")
+        
+        if result and result.get("code") == 200:
+            QMessageBox.information(self, "成功", "数据上报成功！")
+            # 保存成功历史
+            self.save_history(
+                status='成功',
+                data_count=len(self.imported_data),
+                message=str(result.get("content", [])),
+                error_detail=None,
+                source='Excel导入'
+            )
+            # 刷新历史记录
+            if self.main_window:
+                self.main_window.refresh_history()
+        else:
+            QMessageBox.warning(self, "错误", f"上报失败: {str(result)}")
+            # 保存失败历史
+            self.save_history(
+                status='失败',
+                data_count=len(self.imported_data),
+                message="上报失败",
+                error_detail=str(result),
+                source='Excel导入'  # 添加数据来源标识
+            )
+            
+    def on_upload_error(self, error):
+        """上报出错"""
+        self.upload_button.setEnabled(True)
+        self.upload_button.setText("上报数据")
+        
+        QMessageBox.warning(self, "错误", f"上报失败: {error}")
+        # 保存错误历史
+        self.save_history(
+            status='失败',
+            data_count=0,
+            message="执行出错",
+            error_detail=error,
+            source='Excel导入'  # 添加数据来源标识
+        )
             
     def save_history(self, status, data_count, message, error_detail=None, source='Excel导入'):
-        """保存上报历史到JSON文件"""
+        """保存上报历史"""
         try:
-            history_file = 'upload_history.json'
-            history_data = []
-            
-            # 读取现有历史记录
-            if os.path.exists(history_file):
-                try:
-                    with open(history_file, 'r', encoding='utf-8') as f:
-                        history_data = json.load(f)
-                except:
-                    history_data = []
-            
-            # 添加新记录
-            new_record = {
-                'upload_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'status': status,
-                'data_count': data_count,
-                'message': message,
-                'error_detail': error_detail,
-                'source': source  # 添加数据来源标识
-            }
-            
-            # 将新记录添加到开头
-            history_data.insert(0, new_record)
-            
-            # 只保留最近100条记录
-            history_data = history_data[:100]
-            
-            # 保存到文件
-            with open(history_file, 'w', encoding='utf-8') as f:
-                json.dump(history_data, f, indent=4, ensure_ascii=False)
-                
+            HistoryStore().add(status, data_count, message, error_detail, source)
         except Exception as e:
             print(f"保存历史记录失败: {str(e)}")
 
@@ -1825,95 +2038,8 @@ class ImportTab(QWidget):
             if not file_path:
                 return
                 
-            import pandas as pd
-            import numpy as np
-            from datetime import datetime
-            from openpyxl.styles import PatternFill, Font
+            create_import_template(file_path)
             
-            # 创建示例数据
-            example_data = {
-                '统一��会信用代码 (socialCreditCode)': ['91532901792864164X1'] * 4,
-                '企业名称 (compName)': ['云南市方街商贸有限公司'] * 4,
-                '零售点编码 (retailStoreCode)': ['SFJRPA1234'] * 4,
-                '零售点名称 (retailStoreName)': ['四方街商贸零售点'] * 4,
-                '上报日期 (reportDate)': [datetime.now().strftime('%Y-%m-%d')] * 4,
-                '商品编码 (selfCommondityCode)': ['170060'] * 4,
-                '商品名称 (selfCommondityName)': ['大白菜'] * 4,
-                '单位 (unit)': ['公斤'] * 4,
-                '规格 (spec)': ['散装'] * 4,
-                '条码 (barcode)': ['170060'] * 4,
-                '数据类型 (dataType)': [1, 2, 3, 4],  # 初始库存、入库量、销售量、价格
-                '数据值 (dataValue)': [100, 80, 50, 7.00],
-                '转换标志 (dataConvertFlag)': [2] * 4,
-                '供应商编码 (supplierCode)': ['SUP001'] * 4,
-                '供应商名称 (supplierName)': ['大理批发市场'] * 4,
-                '生产商名称 (manufatureName)': ['大理蔬菜基地'] * 4,
-                '产地编码 (originCode)': ['530000'] * 4,
-                '产地名称 (originName)': ['云南省'] * 4,
-                '场景标志 (sceneflag)': [1] * 4
-            }
-            
-            # 建DataFrame
-            df = pd.DataFrame(example_data)
-            
-            # 添加说明行
-            description_data = {
-                '统一社会信用代码 (socialCreditCode)': '企业统一社会信用代码',
-                '企业名称 (compName)': '企业全称',
-                '零售点编码 (retailStoreCode)': '零售点唯一编码',
-                '零售点名称 (retailStoreName)': '零售点名称',
-                '上报日期 (reportDate)': '数据日期（格式：YYYY-MM-DD）',
-                '商品编码 (selfCommondityCode)': '商品唯一编码',
-                '商品名称 (selfCommondityName)': '商品名称',
-                '单位 (unit)': '计量单位',
-                '规格 (spec)': '商品规格',
-                '条码 (barcode)': '商品条形码',
-                '数据类型 (dataType)': '1期初库存、2入库量、3销售量、4价格',
-                '数据值 (dataValue)': '对应数据类型的数值',
-                '转换标志 (dataConvertFlag)': '默认值2',
-                '供应商编码 (supplierCode)': '供应商编码',
-                '供应商名称 (supplierName)': '供应商名称',
-                '生产商名称 (manufatureName)': '生产厂家名称',
-                '产地编码 (originCode)': '产地编码（示例：530000）',
-                '产地名称 (originName)': '产地名称（示例：云南省）',
-                '场景标志 (sceneflag)': '场景标志（默认值1）'
-            }
-            
-            description_df = pd.DataFrame([description_data])
-            
-            # 合并说明和示例数据
-            final_df = pd.concat([description_df, df], ignore_index=True)
-            
-            # 创建Excel写入器
-            with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                # 写入数据页
-                final_df.to_excel(writer, sheet_name='数据模板', index=False)
-                
-                # 获取工作簿和工作表
-                workbook = writer.book
-                worksheet = writer.sheets['数据模板']
-                
-                # 设置列宽
-                for column in worksheet.columns:
-                    max_length = 0
-                    column = [cell for cell in column]
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = (max_length + 2)
-                    worksheet.column_dimensions[column[0].column_letter].width = adjusted_width
-                    
-                # 设置说明行样式
-                yellow_fill = PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid')
-                red_font = Font(color='FF0000')
-                
-                for cell in worksheet[1]:
-                    cell.fill = yellow_fill
-                    cell.font = red_font
-                    
             QMessageBox.information(self, "成功", f"模板文件已保存到：\n{file_path}")
             
         except Exception as e:
@@ -2082,9 +2208,8 @@ class ExcelMappingTab(QWidget):
             
             if file_path:
                 try:
-                    # 读取Excel表头
-                    df = pd.read_excel(file_path, nrows=0)
-                    excel_headers = df.columns.tolist()
+                    # 只读取Excel表头
+                    excel_headers = read_excel_header(file_path)
                     
                     # 清空表格
                     mapping_table.setRowCount(0)
@@ -2616,6 +2741,31 @@ class MainWindow(QMainWindow):
         ''')
         main_layout.addWidget(self.upload_button)
         
+        # 补报：按日期范围补报中断期间未上报的数据
+        backfill_group = QGroupBox("数据补报")
+        backfill_layout = QHBoxLayout()
+        yesterday = QDate.currentDate().addDays(-1)
+        self.backfill_start = QDateEdit(yesterday)
+        self.backfill_end = QDateEdit(yesterday)
+        for date_edit in (self.backfill_start, self.backfill_end):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat('yyyy-MM-dd')
+            date_edit.setMaximumDate(QDate.currentDate())
+        self.backfill_button = QPushButton('开始补报')
+        self.backfill_button.clicked.connect(self.start_backfill)
+        self.backfill_cancel_button = QPushButton('停止补报')
+        self.backfill_cancel_button.setEnabled(False)
+        self.backfill_cancel_button.clicked.connect(self.cancel_backfill)
+        backfill_layout.addWidget(QLabel("开始日期:"))
+        backfill_layout.addWidget(self.backfill_start)
+        backfill_layout.addWidget(QLabel("结束日期:"))
+        backfill_layout.addWidget(self.backfill_end)
+        backfill_layout.addWidget(self.backfill_button)
+        backfill_layout.addWidget(self.backfill_cancel_button)
+        backfill_layout.addStretch()
+        backfill_group.setLayout(backfill_layout)
+        main_layout.addWidget(backfill_group)
+        
         main_tab.setLayout(main_layout)
         
         # 创建并添加定时任务标签页
@@ -2633,12 +2783,15 @@ class MainWindow(QMainWindow):
         tab_widget.addTab(APIConfigTab(), "接口配置")  # 添加API配置标签页
         tab_widget.addTab(TableMappingTab(), "字段映射")
         tab_widget.addTab(ExcelMappingTab(), "Excel映射")
-        tab_widget.addTab(ImportTab(), "数据导入")
+        import_tab = ImportTab()
+        import_tab.set_main_window(self)  # 导入完成后刷新上报历史
+        tab_widget.addTab(import_tab, "数据导入")
         
         layout.addWidget(tab_widget)
         
         # 初始化工作线程
         self.worker = None
+        self.backfill_worker = None
         
     def log(self, message):
         """添加日志到显示区域"""
@@ -2669,6 +2822,41 @@ class MainWindow(QMainWindow):
         """刷新历史记录"""
         if self.history_tab:
             self.history_tab.refresh_history()
+            
+    def start_backfill(self):
+        """开始补报日期范围内的数据"""
+        start = self.backfill_start.date().toString('yyyy-MM-dd')
+        end = self.backfill_end.date().toString('yyyy-MM-dd')
+        if end < start:
+            QMessageBox.warning(self, "错误", "结束日期不能早于开始日期")
+            return
+            
+        self.backfill_button.setEnabled(False)
+        self.backfill_cancel_button.setEnabled(True)
+        self.log_display.clear()
+        
+        self.backfill_worker = BackfillThread(start, end)
+        self.backfill_worker.update_signal.connect(self.log)
+        self.backfill_worker.finished_signal.connect(self.handle_backfill_finished)
+        self.backfill_worker.refresh_history_signal.connect(self.refresh_history)
+        self.backfill_worker.start()
+        
+    def cancel_backfill(self):
+        """停止补报，未开始的日期下次补报时继续"""
+        if self.backfill_worker:
+            self.backfill_worker.cancel()
+            self.backfill_cancel_button.setEnabled(False)
+            self.log("正在停止补报，等待进行中的日期完成...")
+            
+    def handle_backfill_finished(self, success, message):
+        """处理补报完成"""
+        self.log(message)
+        self.backfill_button.setEnabled(True)
+        self.backfill_cancel_button.setEnabled(False)
+        if success:
+            QMessageBox.information(self, "成功", "数据补报完成！")
+        else:
+            QMessageBox.warning(self, "错误", "部分日期补报未完成，请查看日志了解详情。")
 
 class APIConfigTab(QWidget):
     def __init__(self, parent=None):
@@ -2837,6 +3025,8 @@ class APIConfigTab(QWidget):
             return
             
         try:
+            import pandas as pd
+            
             # 读取Excel文件
             df = pd.read_excel(self.file_path.text())
             
@@ -2931,7 +3121,10 @@ class APIConfigTab(QWidget):
                     '说明': field.get('description', '')
                 })
                 
-            # 导出到Excel
+            # 导出到Excel（按需加载 pandas / openpyxl，避免拖慢界面启动）
+            import pandas as pd
+            from openpyxl.styles import PatternFill, Font
+            
             df = pd.DataFrame(data)
             
             # 使用ExcelWriter以便设置格式
@@ -0,0 +1,116 @@
+"""命令行导入上报
+
+不依赖 PyQt5，按"数据导入"页面相同的映射、转换、验证和上报流程处理 Excel / CSV / Parquet 文件，
+可由计划任务或批处理脚本调用。
+
+用法:
+    python import_cli.py 数据.xlsx --mapping 门店映射
+    python import_cli.py pos_20240102.csv.gz --report-date 2024-01-02
+    python import_cli.py 数据.xlsx --dry-run
+
+退出码: 0 全部成功；1 部分或全部上报失败；2 导入失败（文件、字段或验证错误）；3 配置或登录错误
+"""
+import argparse
+import json
+import os
+import sys
+
+from utils.logger import Logger
+from utils.history_store import HistoryStore
+from utils.import_pipeline import (ImportPipeline, ImportFailed, reader_options_from_config,
+                                   upload_records)
+
+logger = Logger('import_cli')
+
+EXIT_OK = 0
+EXIT_UPLOAD_FAILED = 1
+EXIT_IMPORT_FAILED = 2
+EXIT_CONFIG_ERROR = 3
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="导入 Excel / CSV / Parquet 文件并上报零售数据")
+    parser.add_argument('file', help="数据文件路径")
+    parser.add_argument('--mapping', default="默认映射", help="excel_mapping_history.json 中的映射配置名称")
+    parser.add_argument('--report-date', help="只导入该上报日期(YYYY-MM-DD)的数据")
+    parser.add_argument('--config', default='config.json', help="配置文件路径")
+    parser.add_argument('--dry-run', action='store_true', help="只导入和验证，不上报")
+    return parser.parse_args(argv)
+
+def run(args) -> int:
+    """执行导入和上报，返回退出码"""
+    if not os.path.exists(args.file):
+        logger.error(f"文件不存在: {args.file}")
+        return EXIT_IMPORT_FAILED
+
+    try:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except Exception as e:
+        logger.error(f"加载配置文件失败: {str(e)}")
+        return EXIT_CONFIG_ERROR
+
+    source = '命令行导入'
+    last_percent = [-10]
+
+    def progress(percent, message):
+        # 每前进10%输出一次进度
+        if percent >= last_percent[0] + 10 or percent == 100:
+            last_percent[0] = percent
+            logger.info(f"[{percent}%] {message}")
+
+    logger.info(f"开始导入 {args.file}，映射配置: {args.mapping}")
+    try:
+        result = ImportPipeline(
+            args.file,
+            args.mapping,
+            config.get('validation'),
+            progress=progress,
+            source=source,
+            reader_options=reader_options_from_config(config),
+            report_date=args.report_date
+        ).run()
+    except ImportFailed as e:
+        logger.error(str(e))
+        return EXIT_IMPORT_FAILED
+    except Exception as e:
+        logger.error(f"导入失败: {str(e)}")
+        return EXIT_IMPORT_FAILED
+
+    records = result['records']
+    if result['failed_rows']:
+        logger.warning(
+            f"{len(result['failed_rows'])} 行数据验证失败，已写入隔离区(quarantine目录)：\n{result['details']}"
+        )
+    logger.info(f"导入 {len(records)} 条有效数据")
+    if not records:
+        logger.warning("没有需要上报的数据")
+        return EXIT_OK
+    if args.dry_run:
+        logger.info("dry-run 模式，跳过上报")
+        return EXIT_OK
+
+    history = HistoryStore()
+    try:
+        upload_result = upload_records(config, records)
+    except KeyError as e:
+        logger.error(f"配置文件缺少API配置: {str(e)}")
+        return EXIT_CONFIG_ERROR
+    except RuntimeError as e:
+        logger.error(str(e))
+        history.add('失败', len(records), "执行出错", str(e), source)
+        return EXIT_CONFIG_ERROR
+
+    if upload_result and upload_result.get("code") == 200:
+        logger.info(f"数据上报成功，共 {len(records)} 条")
+        history.add('成功', len(records), str(upload_result.get("content", [])), source=source)
+        return EXIT_OK
+
+    logger.error(f"上报失败: {str(upload_result)}")
+    history.add('失败', len(records), "上报失败", str(upload_result), source)
+    return EXIT_UPLOAD_FAILED
+
+def main(argv=None) -> int:
+    return run(parse_args(argv))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""数据表索引检查
+
+按上报查询的条件检查映射数据表的索引，显示当前执行计划和建议创建的索引；
+指定 --apply 时确认后创建索引，并显示创建后的执行计划。
+
+用法:
+    python index_cli.py
+    python index_cli.py --apply
+    python index_cli.py --profile 门店A --apply --yes
+
+退出码: 0 无需创建或已创建；1 有建议但未创建；2 数据库或配置错误
+"""
+import argparse
+import os
+import sys
+
+from db_utils import DatabaseConnection
+from main import DEFAULT_DB_CONFIG, load_config
+from profile_engine import load_profiles
+from utils.index_advisor import IndexAdvisor
+from utils.logger import Logger
+from utils.watermark import WatermarkStore
+
+logger = Logger('index_cli')
+
+EXIT_OK = 0
+EXIT_NOT_APPLIED = 1
+EXIT_ERROR = 2
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="检查上报数据表的索引并对比执行计划")
+    parser.add_argument('--profile', help="按指定门店配置的数据库和字段映射检查")
+    parser.add_argument('--apply', action='store_true', help="创建建议的索引")
+    parser.add_argument('--yes', action='store_true', help="创建索引前不再确认")
+    return parser.parse_args(argv)
+
+def run(args) -> int:
+    """检查索引，返回退出码"""
+    config = load_config()
+    if args.profile:
+        profiles = {profile['name']: profile for profile in load_profiles(config)}
+        if args.profile not in profiles:
+            logger.error(f"门店配置不存在或未启用: {args.profile}")
+            return EXIT_ERROR
+        config = profiles[args.profile]
+
+    incremental = config.get('incremental', {})
+    watermark_column = incremental.get('column', 'id') if incremental.get('enabled') else None
+    table_mapping = config.get('table_mapping')
+    since = None
+    if watermark_column:
+        table_name = (table_mapping or {}).get('table_name', 'retail_data')
+        # 与定时上报相同的水位，执行计划更接近实际查询
+        store = WatermarkStore(os.path.join('profiles', args.profile, 'watermark.json')) if args.profile \
+            else WatermarkStore()
+        since = store.get(f"{table_name}.{watermark_column}")
+
+    db = DatabaseConnection(**(config.get('database') or DEFAULT_DB_CONFIG))
+    try:
+        if not db.test_connection():
+            logger.error("数据库连接失败")
+            return EXIT_ERROR
+        advisor = IndexAdvisor(db, table_mapping, watermark_column, since)
+        if not db.check_table_exists(advisor.table_name):
+            logger.error(f"数据表不存在: {advisor.table_name}")
+            return EXIT_ERROR
+
+        logger.info(f"当前执行计划:\n{IndexAdvisor.format_plan(advisor.explain())}")
+        recommendations = advisor.recommend()
+        if not recommendations:
+            logger.info("无需创建索引")
+            return EXIT_OK
+        for name, columns in recommendations:
+            logger.info(f"建议创建索引: ALTER TABLE {advisor.table_name} ADD INDEX {name} ({', '.join(columns)})")
+
+        if not args.apply:
+            logger.info("使用 --apply 创建以上索引")
+            return EXIT_NOT_APPLIED
+        if not args.yes:
+            answer = input("大表创建索引可能耗时较长，确认创建？(y/N) ").strip().lower()
+            if answer not in ('y', 'yes'):
+                logger.info("已取消")
+                return EXIT_NOT_APPLIED
+
+        advisor.apply(recommendations)
+        logger.info(f"创建后的执行计划:\n{IndexAdvisor.format_plan(advisor.explain())}")
+        return EXIT_OK
+    except Exception as e:
+        logger.error(f"检查索引失败: {str(e)}")
+        return EXIT_ERROR
+    finally:
+        db.close()
+
+def main(argv=None) -> int:
+    return run(parse_args(argv))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,83 +2,285 @@ from retail_api import RetailAPI
 from db_utils import DatabaseConnection
 from utils.logger import Logger
 from utils.validator import DataValidator
+from utils.watermark import WatermarkStore
+from utils.outbox import Outbox
+from utils.quarantine import Quarantine
+from utils.history_store import HistoryStore
 from datetime import datetime
+from typing import Callable, Dict, Optional
+import argparse
+import json
+import os
 import sys
 
 logger = Logger('main')
 
-def get_data_from_db():
-    """从数据库获取数据"""
+# config.json 中没有数据库配置时使用的默认连接参数
+DEFAULT_DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',
+    'password': 'Ces123456',
+    'database': 'retail_report'
+}
+
+# config.json 中没有接口配置时使用的默认接口参数
+DEFAULT_API_CONFIG = {
+    'url': 'http://49.235.172.155:3727/supply-security-api',
+    'username': 'SFJRPA1234',
+    'password': 'Dlbg@123'
+}
+
+class DataValidationError(ValueError):
+    """未开启部分接收时数据验证失败，停止本次上报"""
+
+def load_config() -> dict:
+    """加载 config.json 配置"""
+    try:
+        with open('config.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"加载配置文件失败，使用默认配置: {str(e)}")
+        return {}
+
+def iter_data_from_db(fetch_size: int = 2000, watermark_column: str = None, since=None,
+                      db_config: Optional[Dict] = None, log: Callable[[str], None] = None,
+                      validation: Optional[Dict] = None, table_mapping: Optional[Dict] = None,
+                      report_date: Optional[str] = None):
+    """从数据库流式获取数据，逐批验证后产出 (有效数据, 本批最大水位)
+
+    table_mapping 为空时使用 config.json 中的字段映射；report_date 为空时读取当天的数据。
+
+    validation.partial_accept 开启时，验证失败的记录写入隔离区，其余有效数据照常产出；
+    否则停止读取并抛出 DataValidationError，增量模式下水位不会越过未上报的数据。
+    数据库连接失败、数据表不存在或查询出错时抛出异常，由调用方记录为失败。
+    """
+    log = log or logger.error
+    validation = validation or {}
+    quarantine = Quarantine(
+        max_file_mb=validation.get('max_quarantine_mb', 10),
+        keep_days=validation.get('quarantine_keep_days', 30)
+    ) if validation.get('partial_accept') else None
     logger.info("开始获取数据库数据...")
-    db = DatabaseConnection(
-        host='localhost',
-        user='root',
-        password='Ces123456',
-        database='retail_report'
-    )
-    
+    # 连接取自进程级连接池，定时任务多次执行之间复用同一批连接
+    db = DatabaseConnection(**(db_config or load_config().get('database') or DEFAULT_DB_CONFIG))
+
     try:
         if not db.test_connection():
-            logger.error("数据库连接测试失败")
-            return []
-            
-        if not db.check_table_exists():
-            logger.error("数据表不存在")
-            return []
-            
-        data = db.get_retail_data()
-        
-        # 数据验证
-        failed_records = DataValidator.validate_batch_data(data)
-        if failed_records:
-            logger.error("数据验证失败:")
-            for record in failed_records:
-                logger.error(f"数据: {record['data']}")
-                logger.error(f"错误: {record['error']}")
-            return []
+            raise ConnectionError("数据库连接测试失败")
+
+        table_name = (table_mapping or {}).get('table_name', 'retail_data')
+        if not db.check_table_exists(table_name):
+            raise LookupError(f"数据表不存在: {table_name}")
+
+        total = 0
+        for data in db.iter_retail_data(fetch_size, watermark_column, since, table_mapping, report_date):
+            data, watermark = DatabaseConnection.split_watermark(data)
             
-        logger.info(f"获取到 {len(data)} 条有效数据")
-        return data
-        
-    except Exception as e:
-        logger.error(f"数据库操作失败: {str(e)}")
-        return []
+            # 数据验证
+            failed_records = DataValidator.validate_batch_data(data)
+            if failed_records and quarantine:
+                # 隔离验证失败的记录，只上报有效数据
+                quarantine.add(failed_records)
+                log(Quarantine.summarize(failed_records) + "\n以上数据已写入隔离区(quarantine目录)")
+                failed_ids = {id(record['data']) for record in failed_records}
+                data = [row for row in data if id(row) not in failed_ids]
+            elif failed_records:
+                raise DataValidationError("数据验证失败，停止上报\n" + Quarantine.summarize(failed_records))
+
+            # 整批都被隔离时仍需产出水位，避免下次重复读取
+            if not data and watermark is None:
+                continue
+            total += len(data)
+            yield data, watermark
+
+        logger.info(f"获取到 {total} 条有效数据")
+
     finally:
         db.close()
 
+def get_data_from_db():
+    """从数据库获取数据，读取失败时抛出异常"""
+    data = []
+    for batch, _ in iter_data_from_db():
+        data.extend(batch)
+    return data
+
+def drain_outbox(api: RetailAPI, outbox: Outbox, max_workers: int = 4) -> Dict:
+    """重试发件箱中已到期的批次"""
+    summary = outbox.drain(api.upload_retail_data, max_workers=max_workers)
+    if summary['sent'] or summary['failed']:
+        logger.info(
+            f"发件箱发送: 成功 {summary['sent']} 批 ({summary['sent_rows']} 条)，"
+            f"失败 {summary['failed']} 批 ({summary['failed_rows']} 条)"
+        )
+    return summary
+
+def upload_from_db(api: RetailAPI, config: Dict, db_config: Optional[Dict] = None,
+                   log: Callable[[str], None] = None, source: str = '接口导入',
+                   state_dir: Optional[str] = None, report_date: Optional[str] = None) -> Dict:
+    """从数据库读取新数据并通过发件箱上报
+
+    读取的数据全部写入发件箱后再发送，确认成功后从发件箱删除；失败的批次保留在发件箱中，
+    由后续执行或 drain_outbox 按退避时间重试。增量模式下数据写入发件箱后即推进水位，
+    发件箱保证这些数据最终会被确认，下次执行无需重新抽取。
+    state_dir 指定时发件箱和水位文件保存在该目录下（多门店配置各自独立）。
+    指定 report_date 时读取该日期的全部数据（补报），不使用也不推进增量水位。
+    返回汇总结果: uploaded / failed 条数、合并后的 content、错误信息、发件箱剩余批次数，
+    以及读取数据库或数据验证出错时的 db_error（未出错时为 None，已写入发件箱的数据照常上报）。
+    """
+    info = log or logger.info
+    upload_config = config.get('upload', {})
+    batch_size = upload_config.get('batch_size', 500)
+    max_workers = upload_config.get('max_workers', 4)
+    fetch_size = batch_size * max_workers
+    outbox = Outbox(os.path.join(state_dir, 'outbox.db')) if state_dir else Outbox()
+    summary = {'uploaded': 0, 'failed': 0, 'content': [], 'errors': [], 'db_error': None}
+
+    def drain():
+        if upload_config.get('transport') == 'async' and config.get('api'):
+            # 异步客户端：在一个事件循环中并发发送所有到期批次（按需加载 httpx）
+            from async_retail_api import drain_with_async_client
+            return drain_with_async_client(config['api'], outbox, max_workers, config.get('retry'),
+                                           upload_config)
+        return drain_outbox(api, outbox, max_workers)
+
+    def merge(result):
+        summary['uploaded'] += result['sent_rows']
+        summary['failed'] += result['failed_rows']
+        summary['content'].extend(result['content'])
+        summary['errors'].extend(result['errors'])
+
+    # 先重试发件箱中积压的数据
+    pending = outbox.pending_count()
+    if pending:
+        info(f"发件箱中有 {pending} 批待上报数据，开始重试...")
+        merge(drain())
+
+    # 增量模式：只读取水位之后的数据
+    incremental = config.get('incremental', {})
+    watermark_column = incremental.get('column', 'id') if incremental.get('enabled') and not report_date else None
+    watermark_store = WatermarkStore(os.path.join(state_dir, 'watermark.json')) if state_dir else WatermarkStore()
+    table_mapping = config.get('table_mapping')
+    watermark_key = f"{(table_mapping or {}).get('table_name', 'retail_data')}.{watermark_column}"
+    since = watermark_store.get(watermark_key) if watermark_column else None
+    if watermark_column:
+        info(f"增量上报，当前水位 {watermark_column} > {since}")
+
+    # 先把读取的数据全部写入发件箱，查询结束、连接归还后再上报，
+    # 上报较慢或重试时不会长时间占用数据库连接和未读完的结果集
+    db_config = db_config or config.get('database')
+    queued = 0
+    try:
+        for data, watermark in iter_data_from_db(fetch_size, watermark_column, since, db_config, log,
+                                                 config.get('validation'), table_mapping, report_date):
+            # 写入发件箱后即可推进水位
+            outbox.put_many(data, batch_size, source)
+            queued += len(data)
+            if watermark_column and watermark is not None:
+                watermark_store.set(watermark_key, watermark)
+    except Exception as e:
+        summary['db_error'] = str(e) if isinstance(e, DataValidationError) else f"数据库操作失败: {str(e)}"
+        summary['errors'].append(summary['db_error'])
+        (log or logger.error)(summary['db_error'])
+
+    if queued:
+        info(f"正在上报 {queued} 条数据...")
+        merge(drain())
+
+    summary['pending'] = outbox.pending_count()
+    return summary
+
 def main():
     """主程序入口"""
     try:
         logger.info("=== 程序开始执行 ===")
-        
+        config = load_config()
+        upload_config = config.get('upload', {})
+
+        # 配置了多个门店时按门店并发上报
+        if config.get('profiles'):
+            from profile_engine import ProfileEngine
+            ProfileEngine(config).run()
+            return
+
         # 初始化API客户端
-        api = RetailAPI("http://49.235.172.155:3727/supply-security-api")
-        
+        api_config = config.get('api') or DEFAULT_API_CONFIG
+        api = RetailAPI(api_config['url'], max_workers=upload_config.get('max_workers', 4),
+                        retry_config=config.get('retry'), upload_config=upload_config)
+
         # 登录系统
-        if not api.login("SFJRPA1234", "Dlbg@123"):
+        if not api.login(api_config['username'], api_config['password']):
             logger.error("登录失败")
             return
-            
-        # 获取数据
-        retail_data = get_data_from_db()
-        if not retail_data:
+
+        # 流式获取数据写入发件箱，读取完成后再上报
+        summary = upload_from_db(api, config)
+        for item in summary['content']:
+            logger.info(f"数据ID: {item['soureId']}, 状态: {item['code']}, 消息: {item['msg']}")
+
+        if summary['db_error']:
+            logger.error(f"读取数据失败，已上报 {summary['uploaded']} 条，失败 {summary['failed']} 条")
+            HistoryStore().add('失败', summary['uploaded'] + summary['failed'], "读取数据失败",
+                               "\n".join(summary['errors']), source='定时任务')
+        elif not summary['uploaded'] and not summary['failed']:
             logger.warning("没有获取到需要上报的数据")
-            return
-            
-        # 上报数据
-        result = api.upload_retail_data(retail_data)
-        if result and result.get("code") == 200:
-            logger.info("数据上报成功")
-            for item in result.get("content", []):
-                logger.info(f"数据ID: {item['soureId']}, 状态: {item['code']}, 消息: {item['msg']}")
+        elif summary['failed']:
+            logger.error(f"数据上报完成: 成功 {summary['uploaded']} 条，失败 {summary['failed']} 条")
+            for error in summary['errors']:
+                logger.error(error)
+            HistoryStore().add('失败', summary['failed'],
+                               f"成功 {summary['uploaded']} 条，失败 {summary['failed']} 条",
+                               "\n".join(summary['errors']), source='定时任务')
         else:
-            logger.error("数据上报失败")
-            logger.error(str(result))
-            
+            logger.info(f"数据上报成功，共 {summary['uploaded']} 条")
+            HistoryStore().add('成功', summary['uploaded'], "数据上报成功", source='定时任务')
+        if summary['pending']:
+            logger.warning(f"发件箱中仍有 {summary['pending']} 批数据等待重试")
+
     except Exception as e:
         logger.error(f"程序执行异常: {str(e)}")
     finally:
         logger.info("=== 程序执行完成 ===")
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="从数据库读取当天数据并上报，或补报指定日期范围的数据")
+    parser.add_argument('--backfill', nargs=2, metavar=('START', 'END'),
+                        help="补报日期范围内（含首尾，YYYY-MM-DD）的数据")
+    parser.add_argument('--parallel', type=int, help="补报时最多同时处理的天数，默认读取 backfill.max_parallel")
+    parser.add_argument('--profile', help="补报指定门店配置的数据")
+    parser.add_argument('--restart', action='store_true', help="忽略已完成的日期，全部重新补报")
+    return parser.parse_args(argv)
+
+def run_backfill(args) -> int:
+    """按命令行参数补报，全部日期完成时返回0"""
+    from backfill import Backfill
+    from profile_engine import load_profiles
+
+    config = load_config()
+    state_dir = 'backfill'
+    if args.profile:
+        profiles = {profile['name']: profile for profile in load_profiles(config)}
+        if args.profile not in profiles:
+            logger.error(f"门店配置不存在或未启用: {args.profile}")
+            return 2
+        config = profiles[args.profile]
+        state_dir = os.path.join('profiles', args.profile, 'backfill')
+    elif config.get('profiles'):
+        logger.info("使用顶层配置补报，补报门店数据请使用 --profile 指定门店")
+
+    try:
+        result = Backfill(config, args.backfill[0], args.backfill[1], args.parallel,
+                          state_dir, args.restart).run()
+    except ValueError as e:
+        logger.error(f"补报参数错误: {str(e)}")
+        return 2
+    except Exception as e:
+        logger.error(f"补报失败: {str(e)}")
+        return 1
+    return 0 if all(status.get('state') == '完成' for status in result.values()) else 1
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    args = parse_args()
+    if args.backfill:
+        sys.exit(run_backfill(args))
+    main()
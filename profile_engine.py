@@ -0,0 +1,125 @@
+import copy
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from retail_api import RetailAPI
+from main import DEFAULT_DB_CONFIG, upload_from_db
+from utils.history_store import HistoryStore
+from utils.logger import Logger
+
+logger = Logger('profile_engine')
+
+# 门店配置中可以覆盖的配置段，未覆盖的使用 config.json 顶层的配置
+PROFILE_SECTIONS = ('database', 'api', 'table_mapping', 'upload', 'incremental', 'validation', 'retry')
+
+def load_profiles(config: Dict) -> List[Dict]:
+    """读取 config.json 中启用的门店配置，与顶层配置合并
+
+    每个门店配置的 database / api / table_mapping 等配置段整体覆盖顶层配置。
+    """
+    profiles = []
+    names = set()
+    for profile in config.get('profiles', []):
+        if not profile.get('enabled', True):
+            continue
+        name = profile.get('name', '')
+        if not re.fullmatch(r'[\w\-]+', name):
+            raise ValueError(f"无效的门店配置名称: {name!r}（只能包含字母、数字、下划线和短横线）")
+        if name in names:
+            raise ValueError(f"门店配置名称重复: {name}")
+        names.add(name)
+
+        merged = {key: copy.deepcopy(config[key]) for key in PROFILE_SECTIONS if key in config}
+        merged.update({key: copy.deepcopy(profile[key]) for key in PROFILE_SECTIONS if key in profile})
+        merged['name'] = name
+        profiles.append(merged)
+    return profiles
+
+class ProfileEngine:
+    """多门店并发上报
+
+    每个门店配置使用独立的数据库连接池、API登录、发件箱和水位（profiles/<名称>/），
+    最多同时运行 max_parallel 个门店，单个门店变慢或失败不影响其他门店。
+    各门店的运行状态保存在 profile_status.json 中。
+    """
+    def __init__(self, config: Dict, max_parallel: Optional[int] = None,
+                 state_root: str = 'profiles', status_file: str = 'profile_status.json'):
+        self.profiles = load_profiles(config)
+        engine_config = config.get('engine', {})
+        self.max_parallel = max(1, max_parallel or engine_config.get('max_parallel', 4))
+        self.state_root = state_root
+        self.status_file = status_file
+        self.status = {profile['name']: {'state': '等待'} for profile in self.profiles}
+        self._lock = threading.Lock()
+
+    def _update(self, name: str, **fields):
+        """更新门店状态并写入状态文件"""
+        with self._lock:
+            self.status[name].update(fields)
+            tmp_path = f"{self.status_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.status, f, indent=4, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.status_file)
+
+    def run_profile(self, profile: Dict) -> Dict:
+        """执行单个门店的上报"""
+        name = profile['name']
+        source = f"门店:{name}"
+        self._update(name, state='运行中', started=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                     finished=None, error=None)
+        try:
+            state_dir = os.path.join(self.state_root, name)
+            os.makedirs(state_dir, exist_ok=True)
+
+            api_config = profile['api']
+            upload_config = profile.get('upload', {})
+            api = RetailAPI(api_config['url'], max_workers=upload_config.get('max_workers', 4),
+                            retry_config=profile.get('retry'), upload_config=upload_config)
+            if not api.login(api_config['username'], api_config['password']):
+                raise RuntimeError("API登录失败")
+
+            db_config = dict(profile.get('database') or DEFAULT_DB_CONFIG)
+            # 多个门店可能使用同一个数据库，连接池至少能同时提供 max_parallel 个连接
+            db_config['pool_size'] = max(db_config.get('pool_size', 3), self.max_parallel)
+            log = lambda message: logger.info(f"[{name}] {message}")
+            summary = upload_from_db(api, profile, db_config, log=log,
+                                     source=source, state_dir=state_dir)
+            # 数据库不可用或数据表不存在时同样记为失败，不能显示为成功
+            state = '失败' if summary['failed'] or summary['db_error'] else '成功'
+            if summary['uploaded'] or summary['failed'] or summary['db_error']:
+                HistoryStore().add(state, summary['uploaded'] + summary['failed'],
+                                   f"成功 {summary['uploaded']} 条，失败 {summary['failed']} 条",
+                                   "\n".join(summary['errors']) or None, source)
+            self._update(name, state=state, uploaded=summary['uploaded'], failed=summary['failed'],
+                         pending=summary['pending'], error=summary['db_error'],
+                         finished=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        except Exception as e:
+            logger.error(f"[{name}] 上报失败: {str(e)}")
+            HistoryStore().add('失败', 0, "执行出错", str(e), source)
+            self._update(name, state='失败', error=str(e), finished=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        return self.status[name]
+
+    def run(self, on_finished: Callable[[str, Dict], None] = None) -> Dict[str, Dict]:
+        """并发执行所有门店，返回 {门店名称: 状态}"""
+        if not self.profiles:
+            return {}
+        logger.info(f"开始多门店上报: {len(self.profiles)} 个门店，最多同时运行 {self.max_parallel} 个")
+
+        def run_one(profile):
+            status = self.run_profile(profile)
+            if on_finished:
+                on_finished(profile['name'], status)
+            return status
+
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel, len(self.profiles))) as executor:
+            list(executor.map(run_one, self.profiles))
+
+        failed = [name for name, status in self.status.items() if status['state'] != '成功']
+        logger.info(f"多门店上报完成: 成功 {len(self.profiles) - len(failed)} 个，失败 {len(failed)} 个"
+                    + (f" ({', '.join(failed)})" if failed else ""))
+        return self.status
@@ -1,23 +1,169 @@
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Any, Optional, List
+import base64
+import json
+import os
+import threading
+import time
+
+from utils.payload import REJECTED_STATUSES, PayloadEncoder
+from utils.retry import build_retry
+
+# 可安全重试的请求异常：超时和连接中断（含连接被重置）
+RETRY_EXCEPTIONS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+
+def merge_batch_results(batches: List[List[Dict]], results: List[Optional[Dict]],
+                        errors: Optional[Dict[int, str]] = None) -> Dict:
+    """按批次顺序合并分批上报的结果
+
+    所有批次成功时 code 为 200；否则 code 为 500，成功批次的 content 仍会保留，
+    失败批次记录在 failed_batches 中。
+    """
+    errors = errors or {}
+    content = []
+    failed_batches = []
+    for index, (batch, result) in enumerate(zip(batches, results)):
+        if result and result.get("code") == 200:
+            content.extend(result.get("content", []))
+        else:
+            failed_batches.append({
+                'batch': index + 1,
+                'data_count': len(batch),
+                'error': errors.get(index) or str(result)
+            })
+
+    success = not failed_batches
+    if not success:
+        print(f"分批上报完成: {len(batches) - len(failed_batches)}/{len(batches)} 批成功")
+    return {
+        'code': 200 if success else 500,
+        'msg': 'success' if success else f"{len(failed_batches)} 批数据上报失败",
+        'content': content,
+        'failed_batches': failed_batches
+    }
+
+class TokenCache:
+    """登录token缓存
+
+    按 接口地址+用户名 保存 token 及其过期时间，并持久化到本地文件，
+    定时任务的多次执行和界面操作之间共享，token 临近过期前不再重复登录。
+    """
+    def __init__(self, path: str = 'token_cache.json', default_ttl: int = 1800,
+                 refresh_margin: int = 300):
+        self.path = path
+        self.default_ttl = default_ttl  # 无法解析过期时间时的默认有效期（秒）
+        self.refresh_margin = refresh_margin  # 提前刷新的时间（秒）
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(base_url: str, username: str) -> str:
+        return f"{base_url}|{username}"
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save(self, data: Dict[str, Dict]):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _jwt_expiry(token: str) -> Optional[float]:
+        """token 为 JWT 时读取其中的 exp 过期时间"""
+        parts = token.split('.')
+        if len(parts) != 3:
+            return None
+        try:
+            payload = parts[1] + '=' * (-len(parts[1]) % 4)
+            exp = json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+            return float(exp) if exp else None
+        except Exception:
+            return None
+
+    def get(self, base_url: str, username: str) -> Optional[str]:
+        """获取未临近过期的 token，没有可用 token 时返回 None"""
+        with self._lock:
+            entry = self._load().get(self._key(base_url, username))
+        if entry and entry.get('expires_at', 0) - self.refresh_margin > time.time():
+            return entry.get('token')
+        return None
+
+    def set(self, base_url: str, username: str, token: str):
+        """保存 token，过期时间优先取自 JWT 的 exp"""
+        raw_token = token[len('Bearer '):] if token.startswith('Bearer ') else token
+        expires_at = self._jwt_expiry(raw_token) or time.time() + self.default_ttl
+        with self._lock:
+            data = self._load()
+            data[self._key(base_url, username)] = {'token': token, 'expires_at': expires_at}
+            self._save(data)
+
+    def invalidate(self, base_url: str, username: str):
+        """token 失效（如接口返回401）时清除缓存"""
+        with self._lock:
+            data = self._load()
+            if data.pop(self._key(base_url, username), None) is not None:
+                self._save(data)
 
 class RetailAPI:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, max_workers: int = 4, token_cache: Optional[TokenCache] = None,
+                 retry_config: Optional[Dict] = None, upload_config: Optional[Dict] = None):
         self.base_url = base_url
         self.token = None
+        self.token_cache = token_cache or TokenCache()
+        self._credentials = None
+        self._login_lock = threading.Lock()
         # 设置请求超时和禁用代理
         self.session = requests.Session()
         self.session.trust_env = False  # 禁用环境变量中的代理设置
         self.timeout = 30  # 增加超时时间到30秒
+        # 连接池大小与并发上报线程数保持一致，保证分批并发时复用连接
+        self.max_workers = max(1, max_workers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # 超时、连接中断和429/5xx按指数退避重试，连续失败后熔断（同一接口地址在进程内共用熔断器）
+        self.retry_policies, self.breaker = build_retry(retry_config, url=base_url)
+        # 上报请求体使用紧凑JSON，按 upload.compression 配置压缩
+        self.encoder = PayloadEncoder.from_config(base_url, upload_config)
         
-    def login(self, username: str, password: str) -> bool:
-        """登录并获取token"""
+    def _post(self, endpoint: str, url: str, **kwargs) -> requests.Response:
+        """发送POST请求，按接口对应的重试策略重试"""
+        return self.retry_policies[endpoint].call(
+            lambda: self.session.post(url, timeout=self.timeout, verify=False, **kwargs),
+            RETRY_EXCEPTIONS,
+            self.breaker,
+            name='登录' if endpoint == 'login' else '上报'
+        )
+        
+    def login(self, username: str, password: str, force: bool = False) -> bool:
+        """登录并获取token
+        
+        缓存中有未临近过期的 token 时直接复用，不再请求登录接口；force=True 时强制重新登录。
+        """
+        self._credentials = (username, password)
+        if not force:
+            cached_token = self.token_cache.get(self.base_url, username)
+            if cached_token:
+                self.token = cached_token
+                print("使用缓存的token，跳过登录")
+                return True
+                
         url = f"{self.base_url}/token/grant"
         print(f"正在尝试登录: {url}")
         print(f"用户名: {username}")
         
         try:
-            response = self.session.post(
+            response = self._post(
+                'login',
                 url,
                 data={
                     "username": username,
@@ -25,9 +171,7 @@ class RetailAPI:
                 },
                 headers={
                     'Content-Type': 'application/x-www-form-urlencoded'
-                },
-                timeout=self.timeout,
-                verify=False
+                }
             )
             
             print(f"响应状态码: {response.status_code}")
@@ -38,6 +182,7 @@ class RetailAPI:
                 if result.get("code") == 200:
                     self.token = f"Bearer {result.get('token')}"
                     print(f"获取到token: {self.token}")
+                    self.token_cache.set(self.base_url, username, self.token)
                     return True
                 else:
                     print(f"登录失败: {result.get('msg')}")
@@ -56,38 +201,61 @@ class RetailAPI:
             print(f"其他异常: {str(e)}")
             return False
             
+    def _relogin(self, stale_token: str) -> bool:
+        """token 失效时重新登录，多个线程同时遇到401时只登录一次"""
+        if not self._credentials:
+            return False
+        with self._login_lock:
+            if self.token != stale_token:
+                return True  # 其他线程已刷新token
+            username, password = self._credentials
+            self.token_cache.invalidate(self.base_url, username)
+            print("token已失效，重新登录...")
+            return self.login(username, password, force=True)
+            
+    def _post_data(self, url: str, data: List[Dict], token: str) -> requests.Response:
+        """发送上报请求，压缩的请求体被服务端拒绝（400/415）时不压缩重新发送"""
+        body, headers = self.encoder.encode(data)
+        response = self._post('upload', url, data=body, headers={**headers, 'Authorization': token})
+        if self.encoder.should_fallback(response.status_code, headers):
+            body, headers = self.encoder.encode(data, compress=False)
+            response = self._post('upload', url, data=body, headers={**headers, 'Authorization': token})
+            if response.status_code not in REJECTED_STATUSES:
+                self.encoder.reject()
+        return response
+            
     def upload_retail_data(self, data: List[Dict]) -> Optional[Dict]:
-        """上报零售数据"""
+        """上报零售数据
+        
+        超时、连接中断和429/5xx按重试策略自动重试（每条数据带有固定的itemId，重复提交不会重复入库）；
+        接口返回401时自动重新登录并重试一次。请求体的编码和压缩见 PayloadEncoder。
+        """
         if not self.token:
             print("未登录，请先调用login方法")
             return None
         
         url = f"{self.base_url}/dc/api/v1/collection/retail"
         print(f"开始上报数据到: {url}")
-        print(f"使用token: {self.token}")
-        
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': self.token
-        }
         
         try:
             print(f"上报数据示例: {data[0] if data else 'No data'}")
             print(f"上报数据条数: {len(data)}")
             
-            response = self.session.post(
-                url,
-                json=data,
-                headers=headers,
-                timeout=self.timeout,
-                verify=False
-            )
-            
-            print(f"响应状态码: {response.status_code}")
-            print(f"响应内容: {response.text}")
+            for attempt in range(2):
+                token = self.token
+                print(f"使用token: {token}")
+                response = self._post_data(url, data, token)
+                
+                print(f"响应状态码: {response.status_code}")
+                print(f"响应内容: {response.text}")
+                
+                result = response.json() if response.status_code == 200 else None
+                unauthorized = response.status_code == 401 or (result and result.get("code") == 401)
+                if unauthorized and attempt == 0 and self._relogin(token):
+                    continue
+                break
             
             if response.status_code == 200:
-                result = response.json()
                 print(f"上报结果: {result}")
                 return result
             else:
@@ -98,4 +266,38 @@ class RetailAPI:
         except Exception as e:
             print(f"上报异常: {str(e)}")
             print(f"异常类型: {type(e)}")
-            return None 
\ No newline at end of file
+            return None
+
+    def upload_retail_data_batched(self, data: List[Dict], batch_size: int = 500,
+                                   max_workers: Optional[int] = None) -> Optional[Dict]:
+        """分批并发上报零售数据
+
+        按 batch_size 拆分数据，使用有界线程池并发上报（共享同一个 Session），
+        并将各批次返回的 content 合并为一个结果（见 merge_batch_results）。
+        """
+        if not self.token:
+            print("未登录，请先调用login方法")
+            return None
+
+        if batch_size <= 0 or len(data) <= batch_size:
+            return self.upload_retail_data(data)
+
+        batches = [data[i:i + batch_size] for i in range(0, len(data), batch_size)]
+        workers = min(max_workers or self.max_workers, len(batches))
+        print(f"分批上报: 共 {len(data)} 条数据，{len(batches)} 批，并发数 {workers}")
+
+        results: List[Optional[Dict]] = [None] * len(batches)
+        errors: Dict[int, str] = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.upload_retail_data, batch): index
+                for index, batch in enumerate(batches)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    errors[index] = str(e)
+
+        return merge_batch_results(batches, results, errors)
@@ -1,8 +1,12 @@
+import os
 import schedule
 import time
 from datetime import datetime
-from main import main
+from main import DEFAULT_API_CONFIG, main, drain_outbox, load_config
+from profile_engine import load_profiles
+from retail_api import RetailAPI
 from utils.logger import Logger
+from utils.outbox import Outbox
 
 logger = Logger('scheduler')
 
@@ -45,6 +49,10 @@ def job():
     """定时任务"""
     logger.info("开始执行定时任务")
     try:
+        if load_config().get('cdc', {}).get('enabled'):
+            # 已由 binlog_cdc.py 实时上报，不再定时查询数据库（发件箱重试任务照常运行）
+            logger.info("已启用binlog实时上报，跳过定时查询")
+            return
         main()
         logger.info("定时任务执行完成")
         stats.record_success()
@@ -53,6 +61,56 @@ def job():
         logger.error(error_msg)
         stats.record_failure(error_msg)
 
+def drain_profile_outbox(outbox: Outbox, api_config: dict, upload_config: dict, name: str = '',
+                         retry_config: dict = None):
+    """登录并重试一个发件箱中到期的批次"""
+    if not outbox.due(limit=1):
+        return
+    max_workers = upload_config.get('max_workers', 4)
+    prefix = f"[{name}] " if name else ""
+    
+    if upload_config.get('transport') == 'async':
+        # 异步客户端：在一个事件循环中并发发送所有到期批次（按需加载 httpx）
+        from async_retail_api import drain_with_async_client
+        summary = drain_with_async_client(api_config, outbox, max_workers, retry_config, upload_config)
+        logger.info(f"{prefix}发件箱发送: 成功 {summary['sent']} 批，失败 {summary['failed']} 批")
+        return
+        
+    api = RetailAPI(api_config['url'], max_workers=max_workers, retry_config=retry_config,
+                    upload_config=upload_config)
+    if not api.login(api_config['username'], api_config['password']):
+        logger.error(f"{prefix}发件箱重试登录失败")
+        return
+    drain_outbox(api, outbox, max_workers)
+
+def drain_job():
+    """发件箱重试任务：有到期的待上报批次时登录并重试（多门店配置时逐个门店检查）
+
+    每个发件箱单独处理，一个发件箱重试出错不影响其他发件箱。
+    """
+    try:
+        config = load_config()
+        profiles = load_profiles(config)
+    except Exception as e:
+        logger.error(f"发件箱重试失败: {str(e)}")
+        return
+
+    try:
+        drain_profile_outbox(Outbox(), config.get('api') or DEFAULT_API_CONFIG, config.get('upload', {}),
+                             retry_config=config.get('retry'))
+    except Exception as e:
+        logger.error(f"发件箱重试失败: {str(e)}")
+
+    for profile in profiles:
+        outbox_path = os.path.join('profiles', profile['name'], 'outbox.db')
+        if not os.path.exists(outbox_path):
+            continue
+        try:
+            drain_profile_outbox(Outbox(outbox_path), profile.get('api') or DEFAULT_API_CONFIG,
+                                 profile.get('upload', {}), profile['name'], profile.get('retry'))
+        except Exception as e:
+            logger.error(f"[{profile['name']}] 发件箱重试失败: {str(e)}")
+
 def run_scheduler():
     """运行定时任务"""
     # 测试用：每5分钟执行一次
@@ -61,6 +119,9 @@ def run_scheduler():
     # 测试用：整点过1分时执行
     schedule.every().hour.at(":01").do(job)
     
+    # 每分钟检查发件箱，按退避时间重试失败的批次
+    schedule.every(1).minutes.do(drain_job)
+    
     logger.info("定时任务已启动")
     logger.info("测试配置: 每5分钟执行一次，整点过1分执行")
     
@@ -75,7 +136,7 @@ def run_scheduler():
             time.sleep(60)  # 每分钟检查一次
         except Exception as e:
             logger.error(f"定时任务异常: {str(e)}")
-            time.sleep(300)  # 发生异常时等待5分钟后继续
+            time.sleep(10)  # 接口请求已有重试，调度异常时短暂等待后继续
 
 if __name__ == "__main__":
     try:
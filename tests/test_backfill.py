@@ -0,0 +1,27 @@
+from datetime import date, timedelta
+
+import backfill
+from retail_api import RetailAPI
+
+def test_shared_client_pool_covers_parallel_days(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(RetailAPI, 'login', lambda self, username, password: True)
+    clients = []
+
+    def fake_upload(api, config, db_config, **kwargs):
+        clients.append(api)
+        return {'uploaded': 0, 'failed': 0, 'content': [], 'errors': [], 'db_error': None, 'pending': 0}
+
+    monkeypatch.setattr(backfill, 'upload_from_db', fake_upload)
+    end = date.today()
+    start = end - timedelta(days=4)
+    config = {'api': {'url': 'http://127.0.0.1:9', 'username': 'u', 'password': 'p'},
+              'upload': {'max_workers': 4}}
+    result = backfill.Backfill(config, start.isoformat(), end.isoformat(), max_parallel=3,
+                               state_dir=str(tmp_path / 'backfill')).run()
+
+    assert all(status['state'] == '完成' for status in result.values())
+    api = clients[0]
+    assert all(client is api for client in clients)
+    # 3 天同时补报，每天 4 个上报线程
+    assert api.session.get_adapter('http://127.0.0.1:9')._pool_maxsize == 12
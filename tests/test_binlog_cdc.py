@@ -0,0 +1,143 @@
+import os
+from datetime import date
+
+import pytest
+
+import binlog_cdc
+from binlog_cdc import BinlogCDC, fixture_events, record_events
+from db_utils import load_table_mapping
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TABLE_MAPPING = load_table_mapping(os.path.join(ROOT, 'config.json'))
+
+def make_row(row_id, data_value=10, **fields):
+    row = {
+        'id': row_id, 'social_credit_code': '91530000000000000X', 'comp_name': '测试企业',
+        'retail_store_code': 'S001', 'retail_store_name': '测试门店', 'report_date': date.today().isoformat(),
+        'commodity_code': f'C{row_id:03d}', 'commodity_name': '测试商品', 'unit': '条', 'spec': '20支',
+        'barcode': '6901028000000', 'data_type': 1, 'data_value': data_value, 'data_convert_flag': 0,
+        'standard_commodity_code': '', 'standard_commodity_name': '', 'package_name': '',
+        'supplier_code': '', 'supplier_name': '', 'manufacturer': '', 'origin_code': '', 'origin_name': '',
+        'scene_flag': 1
+    }
+    row.update(fields)
+    return row
+
+def commit(log_pos, log_file='mysql-bin.000001'):
+    return None, [], {'log_file': log_file, 'log_pos': log_pos}
+
+class StubAPI:
+    def __init__(self):
+        self.uploaded = []
+
+    def upload_retail_data(self, rows):
+        self.uploaded.extend(rows)
+        return {'code': 200, 'content': []}
+
+def make_cdc(api=None, batch_size=500):
+    config = {
+        'table_mapping': TABLE_MAPPING,
+        'database': {'database': 'retail_report'},
+        'upload': {'batch_size': batch_size, 'max_workers': 1},
+        'cdc': {'flush_interval': 3600}
+    }
+    return BinlogCDC(config, api)
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # 发件箱、隔离区和位置文件写入临时目录
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def test_recorded_fixture_replay(workdir):
+    events = [
+        ('retail_data', [make_row(1), make_row(2)], None),
+        commit(400),
+        ('retail_data', [make_row(2, data_value=20)], None),
+        ('other_table', [{'id': 9}], None),
+        commit(800),
+        (None, [], None)  # 心跳
+    ]
+    path = str(workdir / 'events.jsonl')
+    assert list(record_events(iter(events), path)) == events
+    with open(path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 5  # 心跳不记录
+
+    api = StubAPI()
+    cdc = make_cdc(api)
+    stats = cdc.run(fixture_events(path))
+
+    uploaded = {row['itemId']: row for row in api.uploaded}
+    today = date.today().strftime('%Y%m%d')
+    assert set(uploaded) == {f'YN{today}000001', f'YN{today}000002'}
+    assert uploaded[f'YN{today}000002']['dataValue'] == 20.0
+    assert stats['rows'] == 3 and stats['failed'] == 0
+    assert cdc.start_position() == {'log_file': 'mysql-bin.000001', 'log_pos': 800}
+
+def test_mid_transaction_flush_resumes_from_last_commit():
+    def crashing():
+        yield 'retail_data', [make_row(1)], None
+        yield commit(400)
+        yield 'retail_data', [make_row(2)], None
+        yield 'retail_data', [make_row(3)], None  # batch_size=1，事务中间已提交批次
+        raise ConnectionError("binlog 连接中断")
+
+    cdc = make_cdc(StubAPI(), batch_size=1)
+    with pytest.raises(ConnectionError):
+        cdc.run(crashing())
+    # 事务未提交，位置停在上一个事务的提交处
+    assert cdc.start_position() == {'log_file': 'mysql-bin.000001', 'log_pos': 400}
+
+    # 重启后从上一个提交处重新读取整个事务，重复的数据按 itemId 去重
+    api = StubAPI()
+    resumed = make_cdc(api, batch_size=1)
+    resumed.run(iter([
+        ('retail_data', [make_row(2)], None),
+        ('retail_data', [make_row(3)], None),
+        commit(900)
+    ]))
+    assert [row['selfCommondityCode'] for row in api.uploaded] == ['C002', 'C003']
+    assert resumed.start_position() == {'log_file': 'mysql-bin.000001', 'log_pos': 900}
+
+def test_binlog_events_yield_positions_only_at_commit(monkeypatch):
+    class Heartbeat: pass
+    class Xid: pass
+    class Query:
+        def __init__(self, query): self.query = query
+    class Write:
+        def __init__(self, rows): self.table, self.rows = 'retail_data', [{'values': row} for row in rows]
+    class Update:
+        def __init__(self, rows): self.table, self.rows = 'retail_data', [{'after_values': row} for row in rows]
+
+    stream_events = [(Query('BEGIN'), 100), (Write([{'id': 1}]), 200), (Update([{'id': 2}]), 300),
+                     (Xid(), 400), (Heartbeat(), 400), (Query('COMMIT'), 500)]
+
+    class FakeStream:
+        log_file = 'mysql-bin.000002'
+
+        def __init__(self, **kwargs):
+            self.kwargs = kwargs
+            self.closed = False
+
+        def __iter__(self):
+            for event, log_pos in stream_events:
+                self.log_pos = log_pos
+                yield event
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(binlog_cdc, 'BinLogStreamReader', FakeStream)
+    for name, cls in (('HeartbeatLogEvent', Heartbeat), ('XidEvent', Xid), ('QueryEvent', Query),
+                      ('WriteRowsEvent', Write), ('UpdateRowsEvent', Update)):
+        monkeypatch.setattr(binlog_cdc, name, cls, raising=False)
+
+    db_config = {'host': 'localhost', 'user': 'root', 'password': '', 'database': 'retail_report'}
+    events = list(binlog_cdc.binlog_events(db_config, 'retail_data'))
+    assert events == [
+        ('retail_data', [{'id': 1}], None),
+        ('retail_data', [{'id': 2}], None),
+        (None, [], {'log_file': 'mysql-bin.000002', 'log_pos': 400}),
+        (None, [], None),
+        (None, [], {'log_file': 'mysql-bin.000002', 'log_pos': 500})
+    ]
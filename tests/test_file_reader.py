@@ -0,0 +1,38 @@
+import pandas as pd
+from openpyxl import Workbook
+
+from utils.file_reader import read_excel
+from utils.validator import DataValidator
+
+ROW = {
+    'socialCreditCode': '91530000000000000X', 'compName': '测试企业', 'retailStoreCode': 'S001',
+    'retailStoreName': '测试门店', 'reportDate': '2026-10-17', 'selfCommondityCode': '00123',
+    'selfCommondityName': '测试商品', 'unit': '条', 'spec': '20支', 'barcode': '6901028000000',
+    'dataType': 1, 'dataValue': 10.5
+}
+TEXT_COLUMNS = [field for field in ROW if field not in ('reportDate', 'dataType', 'dataValue')]
+
+def write_xlsx(path, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(list(ROW))
+    for row in rows:
+        sheet.append([row.get(field) for field in ROW])
+    workbook.save(path)
+
+def test_streaming_read_keeps_blank_text_cells_empty(tmp_path):
+    path = str(tmp_path / 'data.xlsx')
+    write_xlsx(path, [ROW, {**ROW, 'unit': None}, {**ROW, 'barcode': None, 'spec': None}])
+
+    # 阈值为0时 openpyxl 引擎走流式读取
+    df = read_excel(path, columns=list(ROW), text_columns=TEXT_COLUMNS, engine='openpyxl',
+                    streaming_threshold_mb=1e-9)
+
+    assert df.loc[0, 'unit'] == '条'
+    assert df.loc[0, 'selfCommondityCode'] == '00123'
+    assert pd.isna(df.loc[1, 'unit'])
+    assert pd.isna(df.loc[2, 'spec']) and pd.isna(df.loc[2, 'barcode'])
+    assert 'nan' not in df[TEXT_COLUMNS].astype(object).values
+
+    failed = {item['index']: item['error'] for item in DataValidator.validate_dataframe(df)}
+    assert failed == {1: '单位不能为空', 2: '规格不能为空'}
@@ -0,0 +1,81 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from retail_api import RetailAPI
+from utils import payload
+from utils.payload import PayloadEncoder
+
+ROWS = [{'itemId': f'YN20261017{i:06d}', 'compName': '测试企业', 'dataType': 1, 'dataValue': 10.5}
+        for i in range(200)]
+
+class StubHandler(BaseHTTPRequestHandler):
+    """只接受未压缩请求体的上报接口：gzip 请求体返回 415"""
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        encoding = self.headers.get('Content-Encoding')
+        StubHandler.requests.append((self.path, encoding, body))
+        if self.path.endswith('/token/grant'):
+            self._reply(200, {'code': 200, 'token': 'stub'})
+        elif encoding:
+            self._reply(415, {'code': 415, 'msg': 'Unsupported Media Type'})
+        else:
+            rows = json.loads(body)
+            self._reply(200, {'code': 200, 'content': [{'soureId': row['itemId'], 'code': 200, 'msg': 'ok'}
+                                                       for row in rows]})
+
+@pytest.fixture
+def stub_url(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # token 缓存写入临时目录
+    monkeypatch.setattr(payload, '_rejected_urls', set())
+    StubHandler.requests = []
+    server = HTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+def test_encoder_compresses_large_bodies_only():
+    encoder = PayloadEncoder('http://example', compression='gzip', min_size=1024)
+    body, headers = encoder.encode(ROWS)
+    assert headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(body)) == ROWS
+
+    small_body, small_headers = encoder.encode(ROWS[:1])
+    assert 'Content-Encoding' not in small_headers
+    assert json.loads(small_body) == ROWS[:1]
+
+def test_rejected_gzip_is_resent_uncompressed_and_remembered(stub_url):
+    api = RetailAPI(stub_url, upload_config={'compression': 'gzip', 'compression_min_bytes': 1024})
+    assert api.login('user', 'password')
+
+    result = api.upload_retail_data(ROWS)
+    assert result['code'] == 200
+    uploads = [(encoding, body) for path, encoding, body in StubHandler.requests if path.endswith('/retail')]
+    assert [encoding for encoding, _ in uploads] == ['gzip', None]
+    assert json.loads(uploads[1][1]) == ROWS
+    assert stub_url in payload._rejected_urls
+
+    # 同一进程内的后续客户端不再压缩
+    StubHandler.requests = []
+    other = RetailAPI(stub_url, upload_config={'compression': 'gzip'})
+    other.token = api.token
+    assert other.upload_retail_data(ROWS)['code'] == 200
+    assert [encoding for path, encoding, _ in StubHandler.requests] == [None]
@@ -0,0 +1,26 @@
+import json
+import os
+
+import scheduler
+
+def test_drain_job_uses_default_api_and_isolates_profiles(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = {'profiles': [{'name': 'A', 'api': {'url': 'http://a'}}, {'name': 'B'}]}
+    (tmp_path / 'config.json').write_text(json.dumps(config), encoding='utf-8')
+    for name in ('A', 'B'):
+        os.makedirs(tmp_path / 'profiles' / name)
+        (tmp_path / 'profiles' / name / 'outbox.db').touch()
+
+    calls = []
+
+    def fake_drain(outbox, api_config, upload_config, name='', retry_config=None):
+        calls.append((name, api_config['url']))
+        if name == 'A':
+            raise KeyError('username')
+
+    monkeypatch.setattr(scheduler, 'drain_profile_outbox', fake_drain)
+    scheduler.drain_job()
+
+    # 没有 api 配置时使用默认接口，门店 A 出错不影响门店 B
+    assert calls == [('', scheduler.DEFAULT_API_CONFIG['url']), ('A', 'http://a'),
+                     ('B', scheduler.DEFAULT_API_CONFIG['url'])]
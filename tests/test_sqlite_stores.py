@@ -0,0 +1,53 @@
+import sqlite3
+
+import pytest
+
+from utils import history_store, outbox
+from utils.history_store import HistoryStore
+from utils.outbox import Outbox
+
+@pytest.fixture
+def opened(monkeypatch):
+    """记录打开的 SQLite 连接"""
+    connections = []
+    connect = sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        connections.append(conn)
+        return conn
+
+    monkeypatch.setattr(outbox.sqlite3, 'connect', tracking_connect)
+    monkeypatch.setattr(history_store.sqlite3, 'connect', tracking_connect)
+    return connections
+
+def assert_all_closed(connections):
+    assert connections
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+def test_outbox_closes_connections(tmp_path, opened):
+    box = Outbox(str(tmp_path / 'outbox.db'))
+    entry_id = box.put([{'itemId': 'A1'}])
+    box.fail(entry_id, 'timeout')
+    assert box.pending_count() == 1
+    box.ack(entry_id)
+    assert box.due() == []
+    assert_all_closed(opened)
+
+def test_history_store_closes_connections(tmp_path, opened):
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    store.add('成功', 1, 'ok')
+    assert store.count() == 1
+    assert store.query()[0]['message'] == 'ok'
+    assert_all_closed(opened)
+
+def test_failed_write_is_rolled_back(tmp_path):
+    box = Outbox(str(tmp_path / 'outbox.db'))
+    box.put([{'itemId': 'A1'}])
+    with pytest.raises(ZeroDivisionError):
+        with box._connect() as conn:
+            conn.execute("DELETE FROM outbox")
+            1 / 0
+    assert box.pending_count() == 1
@@ -0,0 +1,62 @@
+import main
+from db_utils import DatabaseConnection
+
+VALID = {
+    'socialCreditCode': '91530000000000000X', 'compName': '测试企业', 'retailStoreCode': 'S001',
+    'retailStoreName': '测试门店', 'reportDate': '2026-10-17', 'selfCommondityCode': 'C001',
+    'selfCommondityName': '测试商品', 'unit': '条', 'spec': '20支', 'barcode': '6901028000000',
+    'dataType': 1, 'dataValue': 10.5
+}
+
+class FakeDatabase:
+    """按批返回固定数据的数据库连接"""
+    batches = []
+    split_watermark = staticmethod(DatabaseConnection.split_watermark)
+
+    def __init__(self, **config):
+        pass
+
+    def test_connection(self):
+        return True
+
+    def check_table_exists(self, table_name):
+        return True
+
+    def iter_retail_data(self, *args):
+        for batch in self.batches:
+            yield [dict(row) for row in batch]
+
+    def close(self):
+        pass
+
+class StubAPI:
+    def __init__(self):
+        self.uploaded = []
+
+    def upload_retail_data(self, rows):
+        self.uploaded.extend(rows)
+        return {'code': 200, 'content': []}
+
+def run(tmp_path, monkeypatch, batches, validation):
+    FakeDatabase.batches = batches
+    monkeypatch.setattr(main, 'DatabaseConnection', FakeDatabase)
+    monkeypatch.chdir(tmp_path)
+    api = StubAPI()
+    config = {'upload': {'batch_size': 10, 'max_workers': 1}, 'validation': validation}
+    return api, main.upload_from_db(api, config, {}, state_dir=str(tmp_path))
+
+def test_validation_failure_stops_run_without_partial_accept(tmp_path, monkeypatch):
+    batches = [[{**VALID, 'itemId': 'A1'}], [{**VALID, 'itemId': 'B1', 'unit': ''}], [{**VALID, 'itemId': 'C1'}]]
+    api, summary = run(tmp_path, monkeypatch, batches, {'partial_accept': False})
+
+    assert summary['db_error'].startswith("数据验证失败")
+    # 验证失败之后的数据不再读取
+    assert [row['itemId'] for row in api.uploaded] == ['A1']
+
+def test_partial_accept_quarantines_invalid_rows(tmp_path, monkeypatch):
+    batches = [[{**VALID, 'itemId': 'A1'}, {**VALID, 'itemId': 'B1', 'unit': ''}], [{**VALID, 'itemId': 'C1'}]]
+    api, summary = run(tmp_path, monkeypatch, batches, {'partial_accept': True})
+
+    assert summary['db_error'] is None
+    assert [row['itemId'] for row in api.uploaded] == ['A1', 'C1']
+    assert (tmp_path / 'quarantine').exists()
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from utils.validator import DataValidator
+
+GOOD = {
+    'socialCreditCode': '91530000000000000X', 'compName': '测试企业', 'retailStoreCode': 'S001',
+    'retailStoreName': '测试门店', 'reportDate': '2026-10-17', 'selfCommondityCode': 'C001',
+    'selfCommondityName': '测试商品', 'unit': '条', 'spec': '20支', 'barcode': '6901028000000',
+    'dataType': 1, 'dataValue': 10.5
+}
+
+CASES = [
+    {}, {'dataType': 4, 'dataValue': 0.5}, {'dataValue': 7},
+    # 空值
+    {'compName': ''}, {'unit': None}, {'spec': float('nan')}, {'dataValue': float('nan')},
+    {'dataType': float('nan')}, {'dataType': 0}, {'dataValue': 0},
+    # 类型错误
+    {'dataType': '1'}, {'dataType': '3'}, {'dataType': 1.0}, {'dataType': 2.5}, {'dataValue': '10'},
+    {'dataValue': 'abc'}, {'dataType': 5}, {'dataValue': -1},
+    {'reportDate': '2026/10/17'}, {'reportDate': '2026-13-01'}
+]
+
+def by_index(failed, key):
+    return {item[key]: item['error'] for item in failed}
+
+def assert_same_result(df, records):
+    vectorized = by_index(DataValidator.validate_dataframe(df), 'index')
+    per_row = {}
+    for index, record in enumerate(records):
+        error = DataValidator.validate_retail_data(record)
+        if error:
+            per_row[index] = error
+    assert vectorized == per_row
+    batch = DataValidator.validate_batch_data(records)
+    assert [item['error'] for item in batch] == [per_row[index] for index in sorted(per_row)]
+
+def test_dataframe_and_per_row_validation_agree_on_mixed_rows():
+    rows = [{**GOOD, **case} for case in CASES]
+    assert_same_result(pd.DataFrame(rows), rows)
+
+def test_dataframe_and_per_row_validation_agree_on_typed_columns():
+    # 导入流程中数值列为 int/float 类型，上报前通过 to_dict 转为记录
+    df = pd.DataFrame([GOOD, {**GOOD, 'dataValue': float('nan')}, {**GOOD, 'dataValue': -3.0},
+                       {**GOOD, 'unit': float('nan')}, {**GOOD, 'dataType': 0}])
+    assert_same_result(df, df.to_dict('records'))
+
+def test_numeric_strings_are_rejected():
+    rows = [{**GOOD, 'dataType': '1'}, {**GOOD, 'dataValue': '10'}]
+    assert by_index(DataValidator.validate_dataframe(pd.DataFrame(rows)), 'index') == {
+        0: "数据类型必须是整数", 1: "数据值必须是数字"
+    }
@@ -0,0 +1,205 @@
+import gzip
+import importlib.util
+import os
+from typing import Callable, Dict, Iterable, List, Optional
+
+# 可选的 calamine 引擎（pip install python-calamine），解析速度明显快于 openpyxl
+HAS_CALAMINE = importlib.util.find_spec('python_calamine') is not None
+# 读取 Parquet 需要 pyarrow（pip install pyarrow）
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+# 支持导入的文件类型
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm', '.xls')
+CSV_EXTENSIONS = ('.csv', '.csv.gz', '.gz')
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+FILE_DIALOG_FILTER = ("数据文件 (*.xlsx *.xls *.csv *.csv.gz *.gz *.parquet *.pq);;"
+                      "Excel Files (*.xlsx *.xls);;CSV Files (*.csv *.csv.gz *.gz);;Parquet Files (*.parquet *.pq)")
+
+def clean_header(header) -> str:
+    """去掉模板表头中的API字段名提示，如 '企业名称 (compName)' -> '企业名称'"""
+    header = str(header)
+    return header.split(' (')[0] if ' (' in header else header
+
+def select_engine(path: str, engine: str = 'auto') -> Optional[str]:
+    """选择 Excel 解析引擎：auto 时优先使用 calamine，否则交给 pandas 按扩展名选择"""
+    if engine and engine != 'auto':
+        return engine
+    if HAS_CALAMINE:
+        return 'calamine'
+    return 'openpyxl' if path.lower().endswith(('.xlsx', '.xlsm')) else None
+
+def read_excel_header(path: str, engine: str = 'auto') -> List[str]:
+    """只读取第一行表头"""
+    if select_engine(path, engine) == 'openpyxl':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(max_row=1, values_only=True):
+                return [str(value) for value in row if value is not None]
+            return []
+        finally:
+            workbook.close()
+
+    import pandas as pd
+    return [str(column) for column in pd.read_excel(path, nrows=0, engine=select_engine(path, engine)).columns]
+
+def _read_excel_streaming(path: str, usecols: List[str], dtype: Dict[str, type]):
+    """逐行流式读取 xlsx，只保留需要的列，内存占用与列数成正比"""
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(value) if value is not None else '' for value in next(rows, ())]
+        positions = [(header.index(column), column) for column in usecols if column in header]
+        columns = {column: [] for _, column in positions}
+        for row in rows:
+            if not any(value is not None for value in row):
+                continue  # 跳过空行
+            for position, column in positions:
+                columns[column].append(row[position] if position < len(row) else None)
+    finally:
+        workbook.close()
+
+    df = pd.DataFrame(columns)
+    for column in dtype:
+        if column in df.columns:
+            # 空单元格在 pandas 3 中构建 DataFrame 时已是 NaN，不能转为文本 'nan'
+            df[column] = df[column].map(lambda value: value if pd.isna(value) else _text(value))
+    return df
+
+def _text(value) -> str:
+    """把单元格值转为文本，整数值的浮点数不带小数点"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def read_excel(path: str, columns: Optional[Iterable[str]] = None,
+               text_columns: Optional[Iterable[str]] = None, engine: str = 'auto',
+               streaming_threshold_mb: float = 50):
+    """读取 Excel 文件
+
+    columns: 需要的列（按 clean_header 处理后的表头匹配），为空时读取所有列。
+    text_columns: 按文本读取的列，避免编码、条码等被解析成数字后丢失前导零。
+    没有 calamine 且 xlsx 文件超过 streaming_threshold_mb 时，使用 openpyxl 只读模式逐行读取，
+    只保留需要的列。
+    """
+    import pandas as pd
+
+    header = read_excel_header(path, engine)
+    usecols, dtype = _projection(header, columns, text_columns)
+
+    engine = select_engine(path, engine)
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    if engine == 'openpyxl' and streaming_threshold_mb and size_mb > streaming_threshold_mb:
+        print(f"文件较大({size_mb:.1f}MB)，使用流式读取 {len(usecols)}/{len(header)} 列")
+        return _read_excel_streaming(path, usecols, dtype)
+
+    return pd.read_excel(path, usecols=usecols, dtype=dtype, engine=engine)
+
+def _projection(header: List[str], columns: Optional[Iterable[str]], text_columns: Optional[Iterable[str]]):
+    """按需要的列和文本列计算实际读取的表头和 dtype"""
+    wanted = set(columns) if columns is not None else None
+    usecols = [h for h in header if wanted is None or clean_header(h) in wanted] or header
+    text_columns = set(text_columns or ())
+    return usecols, {h: str for h in usecols if clean_header(h) in text_columns}
+
+def _find_column(header: List[str], names: Iterable[str]) -> Optional[str]:
+    """在表头中查找第一个匹配的列"""
+    names = set(names)
+    return next((h for h in header if clean_header(h) in names), None)
+
+def filter_report_date(df, column: Optional[str], report_date: Optional[str]):
+    """只保留上报日期等于 report_date（YYYY-MM-DD）的行"""
+    import pandas as pd
+
+    if not report_date or not column or column not in df.columns or df.empty:
+        return df
+    dates = pd.to_datetime(df[column], errors='coerce').dt.strftime('%Y-%m-%d')
+    return df[dates == report_date]
+
+def read_csv(path: str, columns: Optional[Iterable[str]] = None,
+             text_columns: Optional[Iterable[str]] = None, date_columns: Iterable[str] = (),
+             report_date: Optional[str] = None, chunksize: int = 100000, encoding: str = 'utf-8-sig',
+             progress: Callable[[float, int], None] = None):
+    """分块读取 CSV 或 gzip 压缩的 CSV
+
+    每块读取后按 report_date 过滤再合并，内存中只保留需要的列和行；
+    progress(已读取比例, 已读取行数) 按文件（压缩后）读取位置报告进度。
+    """
+    import pandas as pd
+
+    size = os.path.getsize(path) or 1
+    with open(path, 'rb') as raw:
+        f = gzip.GzipFile(fileobj=raw) if path.lower().endswith('.gz') else raw
+        header = [str(column) for column in pd.read_csv(f, nrows=0, encoding=encoding).columns]
+        usecols, dtype = _projection(header, columns, text_columns)
+        date_column = _find_column(usecols, date_columns)
+
+        raw.seek(0)
+        f = gzip.GzipFile(fileobj=raw) if path.lower().endswith('.gz') else raw
+        chunks, rows = [], 0
+        for chunk in pd.read_csv(f, usecols=usecols, dtype=dtype, encoding=encoding, chunksize=chunksize):
+            rows += len(chunk)
+            chunks.append(filter_report_date(chunk, date_column, report_date))
+            if progress:
+                progress(min(raw.tell() / size, 1.0), rows)
+
+    if not chunks:
+        return pd.DataFrame(columns=usecols)
+    return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+def read_parquet(path: str, columns: Optional[Iterable[str]] = None,
+                 text_columns: Optional[Iterable[str]] = None, date_columns: Iterable[str] = (),
+                 report_date: Optional[str] = None):
+    """按列读取 Parquet 文件，上报日期条件下推到 pyarrow，只解码满足条件的行组"""
+    if not HAS_PYARROW:
+        raise ImportError("读取 Parquet 文件需要安装 pyarrow: pip install pyarrow")
+    import datetime
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pq.read_schema(path)
+    usecols, dtype = _projection(list(schema.names), columns, text_columns)
+    date_column = _find_column(usecols, date_columns)
+
+    filters = None
+    if report_date and date_column:
+        field_type = schema.field(date_column).type
+        if pa.types.is_string(field_type) or pa.types.is_large_string(field_type):
+            value = report_date
+        elif pa.types.is_date(field_type):
+            value = datetime.date.fromisoformat(report_date)
+        else:
+            value = None  # 时间戳等类型读取后再过滤
+        if value is not None:
+            filters = [(date_column, '==', value)]
+
+    df = pd.read_parquet(path, columns=usecols, filters=filters, engine='pyarrow')
+    if filters is None:
+        df = filter_report_date(df, date_column, report_date)
+    for column in dtype:
+        df[column] = df[column].map(lambda value: value if pd.isna(value) else _text(value))
+    return df
+
+def read_file(path: str, columns: Optional[Iterable[str]] = None,
+              text_columns: Optional[Iterable[str]] = None, date_columns: Iterable[str] = (),
+              report_date: Optional[str] = None, progress: Callable[[float, int], None] = None,
+              engine: str = 'auto', streaming_threshold_mb: float = 50,
+              csv_chunksize: int = 100000, csv_encoding: str = 'utf-8-sig'):
+    """按扩展名读取 Excel、CSV（含 gzip 压缩）或 Parquet 文件
+
+    date_columns 为可能的上报日期列名，指定 report_date 时只返回该日期的数据。
+    """
+    lower = path.lower()
+    if lower.endswith(PARQUET_EXTENSIONS):
+        return read_parquet(path, columns, text_columns, date_columns, report_date)
+    if lower.endswith(CSV_EXTENSIONS):
+        return read_csv(path, columns, text_columns, date_columns, report_date,
+                        csv_chunksize, csv_encoding, progress)
+
+    df = read_excel(path, columns, text_columns, engine, streaming_threshold_mb)
+    return filter_report_date(df, _find_column(list(df.columns), date_columns), report_date)
@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+class HistoryStore:
+    """上报历史存储
+
+    使用 SQLite 保存上报历史，按上报时间、状态、数据来源建立索引。
+    新记录只追加写入，按保留天数和最大条数清理旧记录，支持按条件分页查询。
+    定时任务、界面上报和历史页面共用同一个存储，多进程同时写入时由 SQLite 加锁。
+    首次使用时自动导入旧版 upload_history.json 中的记录。
+    """
+    COLUMNS = ('id', 'upload_time', 'status', 'data_count', 'message', 'error_detail', 'source')
+
+    def __init__(self, path: str = 'upload_history.db', keep_days: int = 180,
+                 max_records: int = 100000, legacy_file: str = 'upload_history.json'):
+        self.path = path
+        self.keep_days = keep_days
+        self.max_records = max_records
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS upload_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    upload_time TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    data_count INTEGER NOT NULL DEFAULT 0,
+                    message TEXT,
+                    error_detail TEXT,
+                    source TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_time ON upload_history (upload_time)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_status ON upload_history (status, upload_time)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_source ON upload_history (source, upload_time)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._import_legacy(conn, legacy_file)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开连接，退出时提交（出错时回滚）并关闭，长时间运行的程序不会累积连接"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _import_legacy(self, conn: sqlite3.Connection, legacy_file: str):
+        """导入旧版 JSON 历史记录（只执行一次）"""
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+            return
+        if legacy_file and os.path.exists(legacy_file):
+            try:
+                with open(legacy_file, 'r', encoding='utf-8') as f:
+                    records = json.load(f)
+                # 旧文件中最新的记录在最前面，按时间先后导入
+                conn.executemany(
+                    "INSERT INTO upload_history (upload_time, status, data_count, message, error_detail, source) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(r.get('upload_time'), r.get('status'), r.get('data_count', 0), r.get('message'),
+                      r.get('error_detail'), r.get('source', '接口导入')) for r in reversed(records)]
+                )
+                print(f"已导入 {len(records)} 条旧版上报历史")
+            except Exception as e:
+                print(f"导入旧版上报历史失败: {str(e)}")
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_imported', '1')")
+
+    def add(self, status: str, data_count: int, message: str, error_detail: Optional[str] = None,
+            source: str = '接口导入') -> int:
+        """追加一条上报历史，返回记录ID"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO upload_history (upload_time, status, data_count, message, error_detail, source) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), status, data_count, message,
+                 error_detail, source)
+            )
+            record_id = cursor.lastrowid
+            self._apply_retention(conn, record_id)
+            return record_id
+
+    def _apply_retention(self, conn: sqlite3.Connection, last_id: int):
+        """按保留天数和最大条数清理旧记录"""
+        if self.keep_days:
+            cutoff = (datetime.now() - timedelta(days=self.keep_days)).strftime('%Y-%m-%d %H:%M:%S')
+            conn.execute("DELETE FROM upload_history WHERE upload_time < ?", (cutoff,))
+        if self.max_records:
+            conn.execute("DELETE FROM upload_history WHERE id <= ?", (last_id - self.max_records,))
+
+    @staticmethod
+    def _where(status: Optional[str] = None, source: Optional[str] = None,
+               start: Optional[str] = None, end: Optional[str] = None,
+               after_id: Optional[int] = None, before_id: Optional[int] = None) -> Tuple[str, list]:
+        conditions, params = [], []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if source:
+            conditions.append("source = ?")
+            params.append(source)
+        if start:
+            conditions.append("upload_time >= ?")
+            params.append(start)
+        if end:
+            conditions.append("upload_time <= ?")
+            params.append(end)
+        if after_id:
+            conditions.append("id > ?")
+            params.append(after_id)
+        if before_id:
+            conditions.append("id < ?")
+            params.append(before_id)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def query(self, status: Optional[str] = None, source: Optional[str] = None,
+              start: Optional[str] = None, end: Optional[str] = None,
+              limit: int = 100, offset: int = 0, after_id: Optional[int] = None,
+              before_id: Optional[int] = None) -> List[Dict]:
+        """按条件分页查询，最新的记录在前
+
+        start / end 为 'YYYY-MM-DD HH:MM:SS' 格式的时间范围。
+        after_id 只取比某条记录更新的记录；before_id 取某条记录之前的一页，
+        翻页时不受新插入记录的影响。
+        """
+        where, params = self._where(status, source, start, end, after_id, before_id)
+        sql = f"SELECT {', '.join(self.COLUMNS)} FROM upload_history{where} ORDER BY id DESC LIMIT ? OFFSET ?"
+        with self._connect() as conn:
+            rows = conn.execute(sql, params + [limit, offset]).fetchall()
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+
+    def count(self, status: Optional[str] = None, source: Optional[str] = None,
+              start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """按条件统计记录数"""
+        where, params = self._where(status, source, start, end)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM upload_history{where}", params).fetchone()[0]
+
+    def sources(self) -> List[str]:
+        """所有出现过的数据来源"""
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT source FROM upload_history ORDER BY source")]
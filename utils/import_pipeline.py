@@ -0,0 +1,257 @@
+import json
+from typing import Callable, Dict, List, Optional
+
+from utils.file_reader import clean_header, read_file
+from utils.validator import DataValidator
+from utils.quarantine import Quarantine
+
+# Excel表头（中文字段名）到接口字段名的默认映射
+DEFAULT_EXCEL_MAPPING = {
+    '统一社会信用代码': 'socialCreditCode',
+    '企业名称': 'compName',
+    '零售点编码': 'retailStoreCode',
+    '零售点名称': 'retailStoreName',
+    '上报日期': 'reportDate',
+    '商品编码': 'selfCommondityCode',
+    '商品名称': 'selfCommondityName',
+    '单位': 'unit',
+    '规格': 'spec',
+    '条码': 'barcode',
+    '数据类型': 'dataType',
+    '数据值': 'dataValue',
+    '转换标志': 'dataConvertFlag',
+    '供应商编码': 'supplierCode',
+    '供应商名称': 'supplierName',
+    '生产商名称': 'manufatureName',
+    '产地编码': 'originCode',
+    '产地名称': 'originName',
+    '场景标志': 'sceneflag'
+}
+
+# 导入文件必须包含的字段
+IMPORT_REQUIRED_FIELDS = {
+    'socialCreditCode': '统一社会信用代码',
+    'compName': '企业名称',
+    'retailStoreCode': '零售点编码',
+    'retailStoreName': '零售点名称',
+    'reportDate': '上报日期',
+    'selfCommondityCode': '商品编码',
+    'selfCommondityName': '商品名称',
+    'dataType': '数据类型',
+    'dataValue': '数据值',
+    'dataConvertFlag': '转换标志',
+    'supplierCode': '供应商编码',
+    'supplierName': '供应商名称',
+    'manufatureName': '生产商名称',
+    'originCode': '产地编码',
+    'originName': '产地名称',
+    'sceneflag': '场景标志'
+}
+
+# 按数值或日期转换的字段，其余字段按文本读取
+NON_TEXT_FIELDS = ('reportDate', 'dataType', 'dataValue', 'dataConvertFlag', 'sceneflag')
+
+class ImportFailed(Exception):
+    """导入失败（缺少字段、格式转换失败、验证失败等），异常信息可直接展示给用户"""
+
+class ImportCancelled(Exception):
+    """导入被用户取消"""
+
+def load_excel_mapping(mapping_name: str, path: str = 'excel_mapping_history.json') -> Dict[str, str]:
+    """按名称加载Excel映射配置，找不到时使用默认映射"""
+    if mapping_name and mapping_name != "默认映射":
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                mappings = json.load(f)
+            for config in mappings['configurations']:
+                if config['name'] == mapping_name:
+                    return config['mappings']
+        except Exception as e:
+            print(f"加载自定义映射配置失败: {str(e)}")
+    return dict(DEFAULT_EXCEL_MAPPING)
+
+def reader_options_from_config(config: Dict) -> Dict:
+    """从 config.json 的 import 配置生成文件读取参数"""
+    import_config = config.get('import', {})
+    return {
+        'engine': import_config.get('excel_engine', 'auto'),
+        'streaming_threshold_mb': import_config.get('streaming_threshold_mb', 50),
+        'csv_chunksize': import_config.get('csv_chunksize', 100000),
+        'csv_encoding': import_config.get('csv_encoding', 'utf-8-sig')
+    }
+
+def upload_records(config: Dict, records: List[Dict]) -> Optional[Dict]:
+    """按 config.json 的 upload 配置分批上报导入的记录
+
+    upload.transport 为 async 且已安装 httpx 时使用异步客户端，否则使用同步客户端的线程池。
+    登录失败时抛出 RuntimeError。
+    """
+    from async_retail_api import httpx, upload_with_async_client
+    from retail_api import RetailAPI
+
+    upload_config = config.get('upload', {})
+    batch_size = upload_config.get('batch_size', 500)
+    max_workers = upload_config.get('max_workers', 4)
+
+    if upload_config.get('transport') == 'async' and httpx is not None:
+        return upload_with_async_client(config['api'], records, batch_size, max_workers, config.get('retry'),
+                                        upload_config)
+
+    api = RetailAPI(config['api']['url'], max_workers=max_workers, retry_config=config.get('retry'),
+                    upload_config=upload_config)
+    if not api.login(config['api']['username'], config['api']['password']):
+        raise RuntimeError("API登录失败")
+    return api.upload_retail_data_batched(records, batch_size=batch_size)
+
+class ImportPipeline:
+    """文件导入流程：读取、字段映射、类型转换、数据验证、生成预览
+
+    支持 Excel、CSV（含 gzip 压缩）和 Parquet 文件，指定 report_date 时只导入该日期的数据。
+
+    不依赖 Qt，可在后台线程或命令行中运行。每个阶段按块处理并通过 progress(百分比, 说明)
+    报告进度，每块处理前检查 is_cancelled()，返回 True 时抛出 ImportCancelled。
+    """
+    # 各阶段名称及其在总进度中的起止百分比
+    STAGES = {
+        'read': ('读取文件', 0, 30),
+        'map': ('字段映射', 30, 35),
+        'convert': ('类型转换', 35, 65),
+        'validate': ('数据验证', 65, 85),
+        'preview': ('生成预览', 85, 100)
+    }
+
+    def __init__(self, path: str, mapping_name: str = "默认映射", validation: Optional[Dict] = None,
+                 chunk_size: int = 10000, progress: Callable[[int, str], None] = None,
+                 is_cancelled: Callable[[], bool] = None, source: str = 'Excel导入',
+                 reader_options: Optional[Dict] = None, report_date: Optional[str] = None):
+        self.path = path
+        self.mapping_name = mapping_name
+        self.validation = validation or {}
+        self.chunk_size = max(1, chunk_size)
+        self.progress = progress or (lambda percent, message: None)
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.source = source
+        self.reader_options = reader_options or {}
+        self.report_date = report_date
+        self.field_mapping = load_excel_mapping(mapping_name)
+
+    def _report(self, stage: str, done: int = 0, total: int = 1, message: Optional[str] = None):
+        """报告阶段内进度"""
+        if self.is_cancelled():
+            raise ImportCancelled("导入已取消")
+        name, start, end = self.STAGES[stage]
+        percent = start + (end - start) * done // max(total, 1)
+        if message:
+            name = f"{name} {message}"
+        elif total > 1:
+            name = f"{name} {done}/{total}"
+        self.progress(percent, name)
+
+    def _chunks(self, df, stage: str):
+        """按块遍历 DataFrame，逐块报告进度"""
+        total = max(1, -(-len(df) // self.chunk_size))
+        for i in range(total):
+            self._report(stage, i, total)
+            yield df.iloc[i * self.chunk_size:(i + 1) * self.chunk_size]
+        self._report(stage, total, total)
+
+    def read(self):
+        """读取文件，只读取映射配置用到的列，文本字段按字符串读取"""
+        self._report('read')
+        # 表头可以是映射中的Excel列名，也可以直接是接口字段名
+        columns = set(self.field_mapping) | set(self.field_mapping.values())
+        text_columns = {header for header, field in self.field_mapping.items() if field not in NON_TEXT_FIELDS}
+        text_columns |= {field for field in self.field_mapping.values() if field not in NON_TEXT_FIELDS}
+        date_columns = {header for header, field in self.field_mapping.items() if field == 'reportDate'}
+        date_columns.add('reportDate')
+        df = read_file(
+            self.path, columns, text_columns, date_columns, self.report_date,
+            progress=lambda fraction, rows: self._report('read', int(fraction * 100), 100, f"已读取 {rows} 行"),
+            **self.reader_options
+        )
+        self._report('read', 1, 1)
+        return df
+
+    def map_columns(self, df):
+        """处理列名并按映射配置重命名"""
+        self._report('map')
+        # 处理列名，移除API字段名提示
+        df.columns = df.columns.map(clean_header)
+        print("原始列名:", df.columns.tolist())
+
+        df = df.rename(columns=self.field_mapping)
+        print("映射后的列名:", df.columns.tolist())
+
+        missing_fields = [name for field, name in IMPORT_REQUIRED_FIELDS.items() if field not in df.columns]
+        if missing_fields:
+            raise ImportFailed(f"缺少必要字段：{', '.join(missing_fields)}")
+        self._report('map', 1, 1)
+        return df
+
+    def convert(self, df):
+        """按块转换数据类型并生成itemId"""
+        import pandas as pd
+
+        converted = []
+        try:
+            for chunk in self._chunks(df, 'convert'):
+                chunk = chunk.copy()
+                chunk['reportDate'] = pd.to_datetime(chunk['reportDate']).dt.strftime('%Y-%m-%d')
+                chunk['dataType'] = chunk['dataType'].astype(int)
+                chunk['dataValue'] = chunk['dataValue'].astype(float)
+                chunk['dataConvertFlag'] = chunk['dataConvertFlag'].astype(int)
+                chunk['sceneflag'] = chunk['sceneflag'].astype(int)
+                chunk['itemId'] = 'YN' + chunk['reportDate'].str.replace('-', '') + chunk.index.astype(str).str.zfill(6)
+                converted.append(chunk)
+        except (ImportCancelled, ImportFailed):
+            raise
+        except Exception as e:
+            raise ImportFailed(f"数据格式转换失败: {str(e)}")
+        return pd.concat(converted) if len(converted) > 1 else converted[0]
+
+    def validate(self, df):
+        """按块验证数据，返回 (有效数据, 验证失败的行, 失败说明)
+
+        未开启部分接收时有验证失败的行直接抛出 ImportFailed；
+        开启时验证失败的行写入隔离区，其余数据继续导入。
+        """
+        failed_rows = []
+        for chunk in self._chunks(df, 'validate'):
+            failed_rows.extend(DataValidator.validate_dataframe(chunk))
+        if not failed_rows:
+            return df, [], ""
+
+        details = "\n".join(f"第 {item['index'] + 2} 行: {item['error']}" for item in failed_rows[:10])
+        if len(failed_rows) > 10:
+            details += f"\n... 共 {len(failed_rows)} 行"
+        if not self.validation.get('partial_accept'):
+            raise ImportFailed(f"数据验证失败：\n{details}")
+
+        failed_index = [item['index'] for item in failed_rows]
+        failed_data = df.loc[failed_index].to_dict('records')
+        Quarantine(
+            max_file_mb=self.validation.get('max_quarantine_mb', 10),
+            keep_days=self.validation.get('quarantine_keep_days', 30)
+        ).add(
+            [{'data': data, 'error': item['error']} for data, item in zip(failed_data, failed_rows)],
+            source=self.source
+        )
+        return df.drop(index=failed_index), failed_rows, details
+
+    def to_records(self, df) -> List[Dict]:
+        """按块生成上报用的记录"""
+        records = []
+        for chunk in self._chunks(df, 'preview'):
+            records.extend(chunk.to_dict('records'))
+        return records
+
+    def run(self) -> Dict:
+        """执行完整导入流程
+
+        返回 {'df': 有效数据, 'records': 上报记录, 'failed_rows': 验证失败的行, 'details': 失败说明}
+        """
+        df = self.read()
+        df = self.map_columns(df)
+        df = self.convert(df) if len(df) else df
+        df, failed_rows, details = self.validate(df)
+        return {'df': df, 'records': self.to_records(df), 'failed_rows': failed_rows, 'details': details}
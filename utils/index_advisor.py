@@ -0,0 +1,97 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from db_utils import DatabaseConnection, load_table_mapping
+
+# 执行计划中展示的列
+PLAN_COLUMNS = ('table', 'type', 'possible_keys', 'key', 'rows', 'Extra')
+
+class IndexAdvisor:
+    """上报数据表的索引建议
+
+    按上报查询实际使用的条件给出索引：report_date 等值过滤，增量模式下还按水位列范围查询并排序，
+    对应索引 (report_date, 水位列)。InnoDB 的二级索引隐含主键列，水位列为主键时 (report_date) 即可。
+    已有索引能覆盖时不再建议；创建前需确认，并对比创建前后的执行计划。
+    """
+    def __init__(self, db: DatabaseConnection, table_mapping: Optional[Dict] = None,
+                 watermark_column: Optional[str] = None, since: Any = None):
+        self.db = db
+        self.table_mapping = table_mapping if table_mapping is not None else load_table_mapping()
+        self.table_name = self.table_mapping.get('table_name', 'retail_data')
+        if not self.table_name or not self.table_name.replace('_', '').isalnum():
+            raise ValueError(f"无效的表名: {self.table_name}")
+        if watermark_column and not watermark_column.replace('_', '').isalnum():
+            raise ValueError(f"无效的水位字段: {watermark_column}")
+        self.watermark_column = watermark_column
+        self.since = since
+
+    def _cursor(self):
+        if not self.db.conn:
+            self.db.connect()
+        return self.db.conn.cursor(buffered=True, dictionary=True)
+
+    def existing_indexes(self) -> Dict[str, List[str]]:
+        """返回表中已有的索引 {索引名: [列名...]}"""
+        cursor = self._cursor()
+        try:
+            cursor.execute(f"SHOW INDEX FROM {self.table_name}")
+            rows = sorted(cursor.fetchall(), key=lambda row: (row['Key_name'], row['Seq_in_index']))
+        finally:
+            cursor.close()
+        indexes: Dict[str, List[str]] = {}
+        for row in rows:
+            indexes.setdefault(row['Key_name'], []).append(row['Column_name'])
+        return indexes
+
+    @staticmethod
+    def _covered(columns: List[str], indexes: Dict[str, List[str]]) -> Optional[str]:
+        """返回能覆盖 columns 的已有索引名（索引以 columns 开头，二级索引末尾隐含主键列）"""
+        primary = indexes.get('PRIMARY', [])
+        for name, index_columns in indexes.items():
+            if name != 'PRIMARY':
+                index_columns = index_columns + [column for column in primary if column not in index_columns]
+            if index_columns[:len(columns)] == columns:
+                return name
+        return None
+
+    def recommend(self) -> List[Tuple[str, List[str]]]:
+        """返回需要创建的索引 [(索引名, [列名...])]"""
+        columns = ['report_date']
+        if self.watermark_column and self.watermark_column != 'report_date':
+            columns.append(self.watermark_column)
+
+        indexes = self.existing_indexes()
+        covered_by = self._covered(columns, indexes)
+        if covered_by:
+            print(f"已有索引 {covered_by} 可覆盖查询条件 ({', '.join(columns)})")
+            return []
+        return [(f"idx_{'_'.join(columns)}"[:64], columns)]
+
+    def explain(self) -> List[Dict]:
+        """返回上报查询的执行计划"""
+        query, params = self.db.compile_retail_query(self.watermark_column, self.since, self.table_mapping)
+        cursor = self._cursor()
+        try:
+            # MySQL 8 的 EXPLAIN 会附带一条 Note，raise_on_warnings 开启时需暂时关闭 Note
+            cursor.execute("SET SESSION sql_notes = 0")
+            cursor.execute(f"EXPLAIN {query}", params or None)
+            return cursor.fetchall()
+        finally:
+            cursor.execute("SET SESSION sql_notes = 1")
+            cursor.close()
+
+    @staticmethod
+    def format_plan(plan: List[Dict]) -> str:
+        """执行计划转为便于阅读的文本"""
+        return "\n".join(
+            ", ".join(f"{column}={row.get(column)}" for column in PLAN_COLUMNS) for row in plan
+        )
+
+    def apply(self, recommendations: List[Tuple[str, List[str]]]):
+        """创建建议的索引"""
+        cursor = self._cursor()
+        try:
+            for name, columns in recommendations:
+                print(f"创建索引 {name} ({', '.join(columns)})...")
+                cursor.execute(f"ALTER TABLE {self.table_name} ADD INDEX {name} ({', '.join(columns)})")
+        finally:
+            cursor.close()
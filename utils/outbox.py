@@ -0,0 +1,148 @@
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# 发送时每页读取的批次数为线程数的倍数
+DRAIN_PAGE_FACTOR = 4
+
+class Outbox:
+    """待上报数据的本地发件箱
+
+    每批数据在发送前先写入 SQLite，接口确认后删除；发送失败的批次保留在发件箱中，
+    按指数退避时间重试。程序重启或网络中断后无需重新抽取数据，也不会丢失数据。
+    """
+    def __init__(self, path: str = 'outbox.db', base_delay: int = 30, max_delay: int = 3600):
+        self.path = path
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    source TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    data_count INTEGER NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_next ON outbox (next_attempt_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开连接，退出时提交（出错时回滚）并关闭，长时间运行的程序不会累积连接"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def put(self, rows: List[Dict], source: str = '接口导入') -> int:
+        """写入一批待上报数据，返回批次ID"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO outbox (source, payload, data_count, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (source, json.dumps(rows, ensure_ascii=False), len(rows), time.time(),
+                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            return cursor.lastrowid
+
+    def put_many(self, rows: List[Dict], batch_size: int, source: str = '接口导入') -> List[int]:
+        """按 batch_size 拆分后写入发件箱"""
+        batch_size = batch_size if batch_size > 0 else max(len(rows), 1)
+        return [self.put(rows[i:i + batch_size], source) for i in range(0, len(rows), batch_size)]
+
+    def ack(self, entry_id: int):
+        """接口确认成功后删除批次"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+
+    def fail(self, entry_id: int, error: str):
+        """记录失败并按指数退避安排下次重试"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT attempts FROM outbox WHERE id = ?", (entry_id,)).fetchone()
+            if not row:
+                return
+            attempts = row[0] + 1
+            delay = min(self.base_delay * (2 ** (attempts - 1)), self.max_delay)
+            conn.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (attempts, time.time() + delay, error, entry_id)
+            )
+
+    def due(self, limit: Optional[int] = None, after_id: int = 0) -> List[Tuple[int, str, List[Dict]]]:
+        """获取已到重试时间的批次 (id, source, rows)，after_id 用于分页"""
+        sql = "SELECT id, source, payload FROM outbox WHERE next_attempt_at <= ? AND id > ? ORDER BY id"
+        params = [time.time(), after_id]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            return [(row[0], row[1], json.loads(row[2])) for row in conn.execute(sql, params)]
+
+    def due_pages(self, page_size: int, limit: Optional[int] = None) -> Iterator[List[Tuple[int, str, List[Dict]]]]:
+        """按页获取到期批次，每页最多 page_size 批，内存中只保留当前页的数据
+
+        limit 指定时最多返回 limit 批。
+        """
+        page_size = max(1, page_size)
+        last_id = 0
+        while limit is None or limit > 0:
+            entries = self.due(page_size if limit is None else min(page_size, limit), last_id)
+            if not entries:
+                return
+            last_id = entries[-1][0]
+            if limit is not None:
+                limit -= len(entries)
+            yield entries
+
+    def pending_count(self) -> int:
+        """发件箱中待上报的批次数"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def drain(self, send: Callable[[List[Dict]], Optional[Dict]], max_workers: int = 1,
+              limit: Optional[int] = None) -> Dict:
+        """发送所有到期批次
+
+        send 为上报函数（如 RetailAPI.upload_retail_data），返回 code 为 200 时视为成功。
+        多个批次通过有界线程池并发发送，数据库读写只在调用线程中进行；
+        到期批次按页读取，积压较多时内存中也只保留一页数据。
+        返回汇总结果: sent / failed 批次数、成功条数、失败条数、合并后的 content 和错误信息。
+        """
+        summary = {'sent': 0, 'failed': 0, 'sent_rows': 0, 'failed_rows': 0,
+                   'content': [], 'errors': []}
+        max_workers = max(1, max_workers)
+        # 积压较多时分页发送，每页为线程数的若干倍，避免一次把所有批次读入内存
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for entries in self.due_pages(max_workers * DRAIN_PAGE_FACTOR, limit):
+                futures = {executor.submit(send, rows): (entry_id, rows) for entry_id, _, rows in entries}
+                for future in as_completed(futures):
+                    entry_id, rows = futures[future]
+                    try:
+                        result = future.result()
+                        error = None if result and result.get("code") == 200 else str(result)
+                    except Exception as e:
+                        result = None
+                        error = str(e)
+
+                    if error is None:
+                        self.ack(entry_id)
+                        summary['sent'] += 1
+                        summary['sent_rows'] += len(rows)
+                        summary['content'].extend(result.get("content", []))
+                    else:
+                        self.fail(entry_id, error)
+                        summary['failed'] += 1
+                        summary['failed_rows'] += len(rows)
+                        summary['errors'].append(error)
+        return summary
@@ -0,0 +1,89 @@
+import gzip
+import json
+import threading
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库 json
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+# 支持的请求体压缩方式
+COMPRESSIONS = ('gzip', 'deflate')
+
+# 服务端不接受压缩请求体时可能返回的状态码
+REJECTED_STATUSES = (400, 415)
+
+# 已确认不接受压缩请求体的接口地址，同一进程内的后续客户端不再尝试压缩
+_rejected_urls = set()
+_rejected_lock = threading.Lock()
+
+def dumps(data: Any) -> bytes:
+    """序列化为紧凑的UTF-8 JSON（无多余空格，中文不转义），已安装 orjson 时使用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+class PayloadEncoder:
+    """上报请求体编码：紧凑JSON，并按配置使用 gzip / deflate 压缩
+
+    服务端对压缩请求体返回400或415时，由调用方用 encode(data, compress=False) 重新发送；
+    未压缩的请求被正常处理后调用 reject()，该接口地址此后不再压缩。
+    """
+    def __init__(self, url: str, compression: Optional[str] = None, min_size: int = 1024, level: int = 6):
+        compression = (compression or 'none').lower()
+        if compression not in COMPRESSIONS + ('none',):
+            print(f"不支持的压缩方式: {compression}，不压缩上报数据")
+            compression = 'none'
+        self.url = url
+        self.compression = None if compression == 'none' else compression
+        self.min_size = min_size  # 小于该字节数的请求体不压缩
+        self.level = level
+
+    @classmethod
+    def from_config(cls, url: str, upload_config: Optional[Dict]) -> 'PayloadEncoder':
+        """从 config.json 的 upload 配置创建"""
+        upload_config = upload_config or {}
+        return cls(
+            url,
+            compression=upload_config.get('compression'),
+            min_size=upload_config.get('compression_min_bytes', 1024),
+            level=upload_config.get('compression_level', 6)
+        )
+
+    @property
+    def enabled(self) -> bool:
+        with _rejected_lock:
+            return self.compression is not None and self.url not in _rejected_urls
+
+    def encode(self, data: Any, compress: bool = True) -> Tuple[bytes, Dict[str, str]]:
+        """返回 (请求体, 请求头)，请求头包含 Content-Type 和压缩时的 Content-Encoding"""
+        body = dumps(data)
+        headers = {'Content-Type': 'application/json'}
+        if not compress or not self.enabled or len(body) < self.min_size:
+            return body, headers
+
+        if self.compression == 'gzip':
+            body = gzip.compress(body, compresslevel=self.level)
+        else:
+            body = zlib.compress(body, self.level)
+        headers['Content-Encoding'] = self.compression
+        return body, headers
+
+    @staticmethod
+    def compressed(headers: Dict[str, str]) -> bool:
+        return 'Content-Encoding' in headers
+
+    def should_fallback(self, status_code: int, headers: Dict[str, str]) -> bool:
+        """压缩的请求被拒绝时，是否需要不压缩重新发送"""
+        return self.compressed(headers) and status_code in REJECTED_STATUSES
+
+    def reject(self):
+        """记录该接口不接受压缩的请求体"""
+        with _rejected_lock:
+            if self.url not in _rejected_urls:
+                print(f"接口不支持 {self.compression} 压缩的请求体，改为不压缩上报: {self.url}")
+            _rejected_urls.add(self.url)
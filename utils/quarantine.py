@@ -0,0 +1,71 @@
+import json
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+class Quarantine:
+    """验证失败数据的隔离区
+
+    验证失败的记录连同原因按天追加写入 quarantine/YYYYMMDD.jsonl，
+    单个文件超过大小上限后不再写入（只计数），超过保留天数的文件自动清理。
+    """
+    def __init__(self, directory: str = 'quarantine', max_file_mb: float = 10, keep_days: int = 30):
+        self.directory = directory
+        self.max_file_bytes = int(max_file_mb * 1024 * 1024)
+        self.keep_days = keep_days
+
+    def _file_path(self) -> str:
+        return os.path.join(self.directory, f"{datetime.now().strftime('%Y%m%d')}.jsonl")
+
+    def _cleanup(self):
+        """删除超过保留天数的隔离文件"""
+        cutoff = (datetime.now() - timedelta(days=self.keep_days)).strftime('%Y%m%d')
+        for name in os.listdir(self.directory):
+            if name.endswith('.jsonl') and name[:8] < cutoff:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def add(self, failed_records: List[Dict], source: str = '接口导入') -> int:
+        """写入验证失败的记录 [{'data': ..., 'error': ...}]，返回实际写入的条数"""
+        if not failed_records:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._cleanup()
+
+        path = self._file_path()
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        written = 0
+        quarantine_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with open(path, 'a', encoding='utf-8') as f:
+            for record in failed_records:
+                line = json.dumps({
+                    'quarantine_time': quarantine_time,
+                    'source': source,
+                    'error': record['error'],
+                    'data': record['data']
+                }, ensure_ascii=False, default=str) + '\n'
+                size += len(line.encode('utf-8'))
+                if size > self.max_file_bytes:
+                    print(f"隔离文件已达到大小上限，{len(failed_records) - written} 条记录未写入: {path}")
+                    break
+                f.write(line)
+                written += 1
+        return written
+
+    @staticmethod
+    def summarize(failed_records: List[Dict], sample_size: int = 3) -> str:
+        """汇总验证失败的记录：按原因计数，并附少量示例"""
+        if not failed_records:
+            return ""
+        counts = Counter(record['error'] for record in failed_records)
+        lines = [f"共 {len(failed_records)} 条数据验证失败:"]
+        for error, count in counts.most_common():
+            lines.append(f"- {error}: {count} 条")
+        for record in failed_records[:sample_size]:
+            data = record['data']
+            item = data.get('itemId') or data.get('selfCommondityCode') or ''
+            lines.append(f"  示例 {item}: {record['error']}")
+        return "\n".join(lines)
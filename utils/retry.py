@@ -0,0 +1,200 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# 可安全重试的HTTP状态码：限流和服务端临时错误
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class CircuitOpenError(Exception):
+    """熔断器已打开，暂停请求"""
+
+class CircuitBreaker:
+    """熔断器
+
+    连续失败 failure_threshold 次后打开，reset_timeout 秒内的请求直接失败，不再访问接口；
+    超时后放行一次试探请求（半开），成功则关闭熔断器，失败则重新计时。
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self) -> bool:
+        """是否允许发送请求"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self._probing:
+                self._probing = True  # 半开状态只放行一个试探请求
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release(self):
+        """结果不能说明接口是否恢复（如非网络异常）时结束试探，不改变熔断状态"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._probing:
+                    print(f"连续失败 {self.failures} 次，暂停请求 {self.reset_timeout} 秒")
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+class RetryPolicy:
+    """重试策略：指数退避加随机抖动
+
+    只重试可安全重试的失败（超时、连接中断、429/5xx），其他错误（如4xx、业务错误）直接返回。
+    第 n 次重试前等待 0 ~ min(max_delay, base_delay * 2^n) 秒之间的随机时间，
+    避免多个线程或进程同时重试。
+    """
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 10,
+                 retry_statuses: Tuple[int, ...] = RETRY_STATUSES):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = retry_statuses
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict], max_attempts: int = 3) -> 'RetryPolicy':
+        """从 config.json 的 retry 配置创建"""
+        config = config or {}
+        return cls(
+            max_attempts=config.get('max_attempts', max_attempts),
+            base_delay=config.get('base_delay', 0.5),
+            max_delay=config.get('max_delay', 10)
+        )
+
+    def delay(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间（attempt 从0开始）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _should_retry(self, response: Any, error: Optional[Exception],
+                      retry_exceptions: Tuple[type, ...], breaker: Optional[CircuitBreaker]) -> bool:
+        """判断本次结果是否需要重试，并记录到熔断器"""
+        if error is not None:
+            retry = isinstance(error, retry_exceptions)
+        else:
+            retry = getattr(response, 'status_code', None) in self.retry_statuses
+        if breaker:
+            if retry:
+                breaker.record_failure()
+            elif error is None:
+                breaker.record_success()
+            else:
+                # 不可重试的异常不能说明接口已恢复，不计为成功
+                breaker.release()
+        return retry
+
+    def call(self, send: Callable[[], Any], retry_exceptions: Tuple[type, ...],
+             breaker: Optional[CircuitBreaker] = None, name: str = '请求') -> Any:
+        """执行 send()，按策略重试，返回最后一次的响应；重试用尽后抛出最后一次的异常"""
+        for attempt in range(self.max_attempts):
+            if breaker and not breaker.allow():
+                raise CircuitOpenError(f"{name}已熔断，稍后再试")
+            response, error = None, None
+            try:
+                response = send()
+            except Exception as e:
+                error = e
+
+            if not self._should_retry(response, error, retry_exceptions, breaker):
+                if error is not None:
+                    raise error
+                return response
+            if attempt + 1 >= self.max_attempts:
+                break
+
+            wait = self.delay(attempt)
+            reason = str(error) if error is not None else f"HTTP {response.status_code}"
+            print(f"{name}失败({reason})，{wait:.1f}秒后第 {attempt + 1} 次重试")
+            time.sleep(wait)
+
+        if error is not None:
+            raise error
+        return response
+
+    async def call_async(self, send: Callable[[], Any], retry_exceptions: Tuple[type, ...],
+                         breaker: Optional[CircuitBreaker] = None, name: str = '请求') -> Any:
+        """call 的异步版本，send 返回协程"""
+        for attempt in range(self.max_attempts):
+            if breaker and not breaker.allow():
+                raise CircuitOpenError(f"{name}已熔断，稍后再试")
+            response, error = None, None
+            try:
+                response = await send()
+            except Exception as e:
+                error = e
+
+            if not self._should_retry(response, error, retry_exceptions, breaker):
+                if error is not None:
+                    raise error
+                return response
+            if attempt + 1 >= self.max_attempts:
+                break
+
+            wait = self.delay(attempt)
+            reason = str(error) if error is not None else f"HTTP {response.status_code}"
+            print(f"{name}失败({reason})，{wait:.1f}秒后第 {attempt + 1} 次重试")
+            await asyncio.sleep(wait)
+
+        if error is not None:
+            raise error
+        return response
+
+# 进程内共享的熔断器，按接口地址和熔断配置区分
+_breakers: Dict[Tuple, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def shared_breaker(url: str, failure_threshold: int = 5, reset_timeout: float = 60) -> CircuitBreaker:
+    """获取（或创建）接口地址对应的进程级熔断器
+
+    定时任务每次执行都会创建新的客户端，共用熔断器后接口故障期间熔断状态在多次执行之间保持，
+    不会每次执行都重新访问接口。
+    """
+    key = (url, failure_threshold, reset_timeout)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(failure_threshold, reset_timeout)
+            _breakers[key] = breaker
+        return breaker
+
+def build_retry(retry_config: Optional[Dict], endpoints: Tuple[str, ...] = ('login', 'upload'),
+                url: Optional[str] = None):
+    """按 config.json 的 retry 配置创建各接口的重试策略和共用的熔断器
+
+    retry.endpoints.<接口> 中的配置覆盖 retry 顶层的默认值，例如单独调整上报接口的重试次数。
+    指定 url 时使用该地址的进程级熔断器（见 shared_breaker）。
+    返回 ({接口: RetryPolicy}, CircuitBreaker)。
+    """
+    retry_config = retry_config or {}
+    overrides = retry_config.get('endpoints', {})
+    policies = {name: RetryPolicy.from_config({**retry_config, **overrides.get(name, {})})
+                for name in endpoints}
+    failure_threshold = retry_config.get('failure_threshold', 5)
+    reset_timeout = retry_config.get('reset_timeout', 60)
+    if url:
+        breaker = shared_breaker(url, failure_threshold, reset_timeout)
+    else:
+        breaker = CircuitBreaker(failure_threshold, reset_timeout)
+    return policies, breaker
@@ -1,28 +1,32 @@
+import math
 from typing import Dict, List, Optional
 from datetime import datetime
 
 class DataValidator:
+    # 必填字段及其中文名称，按校验顺序排列
+    REQUIRED_FIELDS = {
+        'socialCreditCode': '统一社会信用代码',
+        'compName': '企业名称',
+        'retailStoreCode': '零售点编码',
+        'retailStoreName': '零售点名称',
+        'reportDate': '上报日期',
+        'selfCommondityCode': '商品编码',
+        'selfCommondityName': '商品名称',
+        'unit': '单位',
+        'spec': '规格',
+        'barcode': '条码',
+        'dataType': '数据类型',
+        'dataValue': '数据值'
+    }
+    DATA_TYPES = (1, 2, 3, 4)
+
     @staticmethod
     def validate_retail_data(data: Dict) -> Optional[str]:
         """验证单条零售数据"""
-        required_fields = {
-            'socialCreditCode': '统一社会信用代码',
-            'compName': '企业名称',
-            'retailStoreCode': '零售点编码',
-            'retailStoreName': '零售点名称',
-            'reportDate': '上报日期',
-            'selfCommondityCode': '商品编码',
-            'selfCommondityName': '商品名称',
-            'unit': '单位',
-            'spec': '规格',
-            'barcode': '条码',
-            'dataType': '数据类型',
-            'dataValue': '数据值'
-        }
-        
         # 检查必填字段
-        for field, name in required_fields.items():
-            if field not in data or not data[field]:
+        for field, name in DataValidator.REQUIRED_FIELDS.items():
+            # 从 DataFrame 转换的数据中空值为 NaN，与向量化验证一致视为空
+            if field not in data or not data[field] or (isinstance(data[field], float) and math.isnan(data[field])):
                 return f"{name}不能为空"
         
         # 验证数据类型
@@ -33,7 +37,7 @@ class DataValidator:
             # 验证数据类��
             if not isinstance(data['dataType'], int):
                 return "数据类型必须是整数"
-            if data['dataType'] not in [1, 2, 3, 4]:
+            if data['dataType'] not in DataValidator.DATA_TYPES:
                 return "数据类型必须是1,2,3,4之一"
                 
             # 验证数据值
@@ -60,4 +64,66 @@ class DataValidator:
                     'error': error
                 })
                 
-        return failed_records 
\ No newline at end of file
+        return failed_records
+
+    @staticmethod
+    def validate_dataframe(df) -> List[Dict]:
+        """按列向量化验证数据，返回验证失败的行 [{'index': 行索引, 'error': 原因}]
+
+        df 可以是 pandas DataFrame，也可以是 {字段名: 值列表} 形式的列数据。
+        校验规则和顺序与 validate_retail_data 一致（数字字符串同样视为类型错误），
+        每行只返回第一个错误原因。
+        """
+        import numpy as np
+        import pandas as pd
+
+        if not isinstance(df, pd.DataFrame):
+            df = pd.DataFrame(df)
+        if df.empty:
+            return []
+
+        errors = pd.Series(None, index=df.index, dtype=object)
+
+        def mark(mask, message):
+            errors[mask & errors.isna()] = message
+
+        # 检查必填字段
+        for field, name in DataValidator.REQUIRED_FIELDS.items():
+            if field not in df.columns:
+                mark(pd.Series(True, index=df.index), f"{name}不能为空")
+                continue
+            column = df[field]
+            mark(column.isna() | column.isin(['', 0]), f"{name}不能为空")
+
+        if errors.notna().all():
+            return [{'index': index, 'error': error} for index, error in errors.items()]
+
+        # 验证日期格式
+        dates = pd.to_datetime(df['reportDate'].astype(str), format='%Y-%m-%d', errors='coerce')
+        mark(dates.isna(), "日期格式错误，应为YYYY-MM-DD")
+
+        # 验证数据类型：与 isinstance 判断一致，按原始值的类型判断，数字字符串不算数字
+        data_type_ok = DataValidator._is_instance(df['dataType'], 'iub', (int, np.integer))
+        data_type = pd.to_numeric(df['dataType'].where(data_type_ok), errors='coerce')
+        mark(~data_type_ok, "数据类型必须是整数")
+        mark(~data_type.isin(DataValidator.DATA_TYPES), "数据类型必须是1,2,3,4之一")
+
+        # 验证数据值
+        data_value_ok = DataValidator._is_instance(df['dataValue'], 'iufb', (int, float, np.integer, np.floating))
+        data_value = pd.to_numeric(df['dataValue'].where(data_value_ok), errors='coerce')
+        mark(~data_value_ok, "数据值必须是数字")
+        mark(data_value < 0, "数据值不能为负数")
+
+        failed = errors.dropna()
+        return [{'index': index, 'error': error} for index, error in failed.items()]
+
+    @staticmethod
+    def _is_instance(column, kinds: str, types: tuple):
+        """按列判断每个值是否为指定类型：数值列按 dtype 判断，object 列逐个判断原始值"""
+        import pandas as pd
+
+        if column.dtype.kind in kinds:
+            return pd.Series(True, index=column.index)
+        if column.dtype == object:
+            return column.map(lambda value: isinstance(value, types))
+        return pd.Series(False, index=column.index)
@@ -0,0 +1,45 @@
+import json
+import os
+from typing import Any, Dict
+
+class WatermarkStore:
+    """增量上报水位存储
+
+    以 JSON 文件保存每个数据源已确认上报的最大水位值（如 id 或 created_at），
+    写入时先写临时文件再替换，避免程序中断导致文件损坏。
+    """
+    def __init__(self, path: str = 'watermark.json'):
+        self.path = path
+
+    def _load(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"读取水位文件失败: {str(e)}")
+            return {}
+
+    def _save(self, data: Dict[str, Any]):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str) -> Any:
+        """获取水位值，不存在时返回 None"""
+        return self._load().get(key)
+
+    def set(self, key: str, value: Any):
+        """更新水位值"""
+        data = self._load()
+        data[key] = value
+        self._save(data)
+
+    def reset(self, key: str):
+        """清除水位，下次将重新全量读取"""
+        data = self._load()
+        if key in data:
+            data.pop(key)
+            self._save(data)